@@ -1,18 +1,64 @@
+import ctypes
+import ctypes.util
+import errno
 import os
 import re
+import hashlib
+import heapq
+import hmac
+import io
 import json
+import mimetypes
+import queue
+import select
+import shutil
 import sqlite3
+import struct
+import sys
+import threading
 import time
+import warnings
+import wave
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from contextlib import contextmanager
 from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+from urllib.parse import parse_qs, quote, urlsplit
 
 import streamlit as st
 
+try:
+    import fcntl  # reflink ioctl; not on Windows
+except ImportError:
+    fcntl = None
+try:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        import aifc  # AIFF headers; deprecated since 3.11 and gone in 3.13
+except ImportError:
+    aifc = None
+try:
+    import numpy as np  # waveform peaks
+except ImportError:
+    np = None
+try:
+    from PIL import Image, ImageOps  # image size, EXIF and previews; reportlab depends on it anyway
+except ImportError:
+    Image = ImageOps = None
+
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.units import inch
 from reportlab.pdfgen import canvas
 
+from repository import (
+    TAG_TABLES, EvidenceRecord, EvidenceRepo, ImportItemRecord, ImportJobRecord, ImportRepo, Repos,
+    ScanCacheRepo, SearchHitRecord, WatchFolderRecord, WatchRepo, set_tags,
+)
+
 
 # =========================
 # Configuration
@@ -24,6 +70,86 @@ ASSETS_DIR = Path("assets")
 DEFAULT_LOGO_PATH = ASSETS_DIR / "logo.png"
 DB_PATH = DATA_DIR / "basecamp.sqlite3"
 SHUTDOWN_FLAG = DATA_DIR / "shutdown.flag"
+THUMB_DIR = DATA_DIR / "thumbs"
+
+# SQLite durability/throughput profile, picked with BASECAMP_DB_PROFILE.
+#   field-safe: every commit is fsync'd (survives power loss mid-session). Default.
+#   fast:       WAL checkpoints are fsync'd, commits are not; a power cut can drop
+#               the last few writes but never corrupts the database.
+# Both use WAL so readers never block on a writer. Numbers from `python bench_db.py`
+# (ext4 VM disk, 1 vCPU): single-row commits/s | batched rows/s | timeline reads/s while a writer runs
+#   field-safe:   ~8,000 | ~135,000 | ~950
+#   fast:        ~19,000 | ~170,000 | ~1,100
+DB_PROFILES = {
+    "field-safe": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "mmap_size": 0,
+        "cache_size": -16000,   # KiB
+        "temp_store": "DEFAULT",
+        "busy_timeout": 10000,  # ms
+    },
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64000,
+        "temp_store": "MEMORY",
+        "busy_timeout": 10000,
+    },
+}
+DB_PROFILE = os.environ.get("BASECAMP_DB_PROFILE", "field-safe")
+
+# UI writes go through one writer thread (see WriteQueue)
+WRITE_QUEUE_SIZE = 1000        # submit() blocks once this many writes are waiting
+WRITE_GROUP_MAX = 256          # most writes coalesced into a single commit
+WRITE_ACK_TIMEOUT = 1.0        # seconds a button handler waits for its commit before rerunning anyway
+
+# ingest writes evidence rows in group commits of this many files
+INGEST_COMMIT_EVERY = int(os.environ.get("BASECAMP_INGEST_COMMIT_EVERY", "200"))
+# evidence copies stream through one buffer of this size (and hash it on the way)
+COPY_BUFFER_SIZE = 1024 * 1024
+QUICK_HASH_SPAN = 64 * 1024  # bytes hashed from each end of a file for the dedup pre-check
+# ingest pipeline: items waiting between stages, and parallel copies per source device
+INGEST_QUEUE_SIZE = 64
+INGEST_WORKERS_PER_DEVICE = int(os.environ.get("BASECAMP_INGEST_WORKERS", "2"))
+INGEST_METADATA_WORKERS = max(1, int(os.environ.get("BASECAMP_METADATA_WORKERS", "2")))
+INGEST_MAX_ATTEMPTS = 4        # tries per file before it stays failed
+INGEST_RETRY_DELAY = 2.0       # seconds before the first retry; doubles each attempt
+# watch folders: the watcher thread wakes at least this often, and rescans inotify-covered
+# folders this often in case an event was missed
+WATCH_TICK_SECONDS = 1.0
+WATCH_SAFETY_SECONDS = 60.0
+# folder scans don't cache directories modified this recently (timestamp granularity)
+SCAN_RACY_SECONDS = 2.0
+# a watched file is imported once its size and mtime have held still this long
+WATCH_QUIET_SECONDS = float(os.environ.get("BASECAMP_WATCH_QUIET_SECONDS", "5"))
+# evidence files are served to the browser by a small HTTP server in this process;
+# port 0 picks a free one. Set BASECAMP_FILE_URL to the address browsers should use
+# when the console is opened from another machine (and bind a reachable host).
+FILE_SERVER_HOST = os.environ.get("BASECAMP_FILE_HOST", "127.0.0.1")
+FILE_SERVER_PORT = int(os.environ.get("BASECAMP_FILE_PORT", "0"))
+FILE_SERVER_URL = os.environ.get("BASECAMP_FILE_URL")
+# photo previews: longest side in pixels, disk budget for the cache, decode threads
+THUMB_SIZE = 320
+THUMB_CACHE_BYTES = int(os.environ.get("BASECAMP_THUMB_CACHE_MB", "256")) * 1024 * 1024
+THUMB_WORKERS = 2
+# waveform overviews kept in a .peaks file next to each WAV: one min/max pair per
+# PEAKS_BASE_FRAMES frames at the finest of PEAKS_LEVELS zoom levels, each level 4x coarser
+PEAKS_BASE_FRAMES = 256
+PEAKS_LEVELS = 4
+PEAKS_CHUNK_FRAMES = PEAKS_BASE_FRAMES * 1024  # samples are read this many frames at a time
+# How a file reaches the evidence folder, cheapest first; the streaming copy is always
+# the last resort. reflink (copy-on-write clone, btrfs/XFS/APFS-style) is as safe as a
+# copy, a hardlink shares the source's inode, and a rename takes the source away.
+# "move" removes the source in every case: when the file was cloned or copied
+# instead (another drive, or linked to a copy from another session), the source is
+# deleted once its row is committed.
+INGEST_MODES = {
+    "copy": ("reflink",),
+    "link": ("reflink", "hardlink"),
+    "move": ("rename", "reflink"),
+}
 
 DEFAULT_AUTHORS = ["Basecamp", "Lead", "Investigator A", "Investigator B"]
 DEFAULT_TAGS = ["voice", "footsteps", "EMF", "provocation", "response", "motion", "temp", "knock", "whisper"]
@@ -42,6 +168,7 @@ EVIDENCE_TYPES = ["AUTO", "AUDIO", "VIDEO", "PHOTO", "DOC", "OTHER"]
 # auto-type detection
 EXT_TYPE = {
     ".wav": "AUDIO", ".mp3": "AUDIO", ".m4a": "AUDIO", ".aac": "AUDIO", ".flac": "AUDIO",
+    ".aif": "AUDIO", ".aiff": "AUDIO",
     ".mp4": "VIDEO", ".mov": "VIDEO", ".mkv": "VIDEO", ".avi": "VIDEO", ".wmv": "VIDEO",
     ".jpg": "PHOTO", ".jpeg": "PHOTO", ".png": "PHOTO", ".heic": "PHOTO", ".webp": "PHOTO",
     ".pdf": "DOC", ".txt": "DOC", ".doc": "DOC", ".docx": "DOC",
@@ -60,27 +187,210 @@ def fmt_ts(dt: datetime) -> str:
 def fmt_time(dt: datetime) -> str:
     return dt.strftime("%H:%M")
 
+def to_ms(dt: datetime) -> int:
+    # epoch milliseconds: the sort/index key stored next to every display timestamp
+    return int(dt.timestamp() * 1000)
+
+def from_ms(ms: int) -> datetime:
+    return datetime.fromtimestamp(ms / 1000)
+
+def fmt_bytes(n: int) -> str:
+    size = float(n)
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+def fmt_duration(ms: int) -> str:
+    seconds = ms // 1000
+    hours, rest = divmod(seconds, 3600)
+    return f"{hours}:{rest // 60:02d}:{rest % 60:02d}" if hours else f"{rest // 60}:{rest % 60:02d}"
+
+Source = Union[Path, BinaryIO]  # a file on disk, or an open binary stream such as an UploadedFile
+
+
+@contextmanager
+def open_source(src: Source) -> Iterator[BinaryIO]:
+    """Opens a path for reading, or rewinds a stream that is already open."""
+    if isinstance(src, (str, os.PathLike)):
+        with open(src, "rb") as f:
+            yield f
+    else:
+        src.seek(0)
+        yield src
+
+
+def copy_with_hash(src: Source, dst: Path, progress: Optional[Callable[[int], None]] = None) -> Tuple[int, str]:
+    """
+    Copies src to dst through a single fixed buffer, computing SHA-256 in the same
+    pass, and returns (size, hex digest). Memory use is COPY_BUFFER_SIZE however
+    large the file. Data lands in a .part file that is renamed into place, so a
+    crash never leaves a truncated file under the final name. progress, if given,
+    is called with the byte count of every chunk written.
+    """
+    digest = hashlib.sha256()
+    buf = bytearray(COPY_BUFFER_SIZE)
+    view = memoryview(buf)
+    tmp = dst.with_name(dst.name + ".part")
+    size = 0
+    try:
+        with open_source(src) as fin, open(tmp, "wb") as fout:
+            while True:
+                n = fin.readinto(buf)
+                if not n:
+                    break
+                digest.update(view[:n])
+                fout.write(view[:n])
+                size += n
+                if progress:
+                    progress(n)
+        if isinstance(src, Path):
+            shutil.copystat(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return size, digest.hexdigest()
+
+
+def hash_file(path: Source) -> str:
+    digest = hashlib.sha256()
+    buf = bytearray(COPY_BUFFER_SIZE)
+    view = memoryview(buf)
+    with open_source(path) as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            digest.update(view[:n])
+    return digest.hexdigest()
+
+
+FICLONE = 0x40049409  # linux/fs.h
+
+def reflink(src: Path, dst: Path):
+    """Clones src into dst sharing its blocks copy-on-write; OSError where unsupported."""
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "reflink not supported on this platform")
+    tmp = dst.with_name(dst.name + ".part")
+    try:
+        with open(src, "rb") as fin, open(tmp, "wb") as fout:
+            fcntl.ioctl(fout.fileno(), FICLONE, fin.fileno())
+        shutil.copystat(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def quick_hash(path: Source, size: int) -> str:
+    """
+    SHA-256 over the size plus the first and last QUICK_HASH_SPAN bytes. Cheap
+    enough to run on every candidate; only a match here warrants a full hash.
+    """
+    digest = hashlib.sha256(str(size).encode())
+    with open_source(path) as f:
+        digest.update(f.read(QUICK_HASH_SPAN))
+        if size > QUICK_HASH_SPAN:
+            f.seek(max(QUICK_HASH_SPAN, size - QUICK_HASH_SPAN))
+            digest.update(f.read(QUICK_HASH_SPAN))
+    return digest.hexdigest()
+
+
 def safe_filename(name: str) -> str:
     name = name.strip()
     name = re.sub(r"[^\w\-. ]+", "_", name)
     name = re.sub(r"\s+", "_", name)
     return name[:180] if len(name) > 180 else name
 
-def ensure_dirs():
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    SESSIONS_DIR.mkdir(parents=True, exist_ok=True)
-
-def connect_db() -> sqlite3.Connection:
-    ensure_dirs()
-    con = sqlite3.connect(DB_PATH)
+def connect_db(path: Path = DB_PATH, profile: str = DB_PROFILE) -> sqlite3.Connection:
+    if profile not in DB_PROFILES:
+        raise ValueError(f"Unknown DB profile {profile!r} (expected one of: {', '.join(DB_PROFILES)})")
+    pragmas = DB_PROFILES[profile]
+    # autocommit mode: transactions are opened explicitly via Database.transaction()
+    con = sqlite3.connect(path, timeout=pragmas["busy_timeout"] / 1000, isolation_level=None,
+                          check_same_thread=False, cached_statements=256)
     con.row_factory = sqlite3.Row
+    for name in ("busy_timeout", "journal_mode", "synchronous", "mmap_size", "cache_size", "temp_store"):
+        con.execute(f"PRAGMA {name} = {pragmas[name]}").fetchall()
     return con
 
-def init_db():
-    con = connect_db()
-    cur = con.cursor()
 
-    cur.execute("""
+# =========================
+# Database
+# =========================
+class Database:
+    """
+    Process-wide connection manager. Each thread keeps one connection (and its
+    prepared-statement cache); when a thread goes away its connection returns to
+    an idle pool, so the next Streamlit script thread picks up a warm one.
+    """
+
+    def __init__(self, path: Path, profile: str = DB_PROFILE):
+        self.path = path
+        self.profile = profile
+        self._local = threading.local()
+        self._idle: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._savepoints = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+    def _checkin(self, con: sqlite3.Connection):
+        if con.in_transaction:
+            con.rollback()
+        with self._lock:
+            self._idle.append(con)
+
+    def connection(self) -> sqlite3.Connection:
+        con = getattr(self._local, "con", None)
+        if con is None:
+            with self._lock:
+                con = self._idle.pop() if self._idle else None
+            if con is None:
+                con = connect_db(self.path, self.profile)
+            self._local.con = con
+            weakref.finalize(threading.current_thread(), self._checkin, con)
+        return con
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        `with db.transaction() as con:` commits on success and rolls back on error.
+        Nested blocks on the same thread become savepoints.
+        """
+        con = self.connection()
+        if con.in_transaction:
+            with self._lock:
+                self._savepoints += 1
+                name = f"sp_{self._savepoints}"
+            con.execute(f"SAVEPOINT {name}")
+            try:
+                yield con
+            except BaseException:
+                con.execute(f"ROLLBACK TO {name}")
+                con.execute(f"RELEASE {name}")
+                raise
+            con.execute(f"RELEASE {name}")
+            return
+
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            yield con
+        except BaseException:
+            con.rollback()
+            raise
+        con.commit()
+
+
+# =========================
+# Schema migrations
+# =========================
+# Numbered and append-only: never edit a shipped step, add a new one instead.
+# PRAGMA user_version holds the last applied number; migrate() runs once per
+# process (from get_db) and applies only the pending steps in one transaction.
+def _m001_base_schema(con: sqlite3.Connection):
+    # IF NOT EXISTS: databases created before migrations already have these tables
+    con.execute("""
     CREATE TABLE IF NOT EXISTS sessions (
         session_id TEXT PRIMARY KEY,
         started_at TEXT NOT NULL,
@@ -90,7 +400,7 @@ def init_db():
     )
     """)
 
-    cur.execute("""
+    con.execute("""
     CREATE TABLE IF NOT EXISTS logs (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         session_id TEXT NOT NULL,
@@ -103,7 +413,7 @@ def init_db():
     )
     """)
 
-    cur.execute("""
+    con.execute("""
     CREATE TABLE IF NOT EXISTS events (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         session_id TEXT NOT NULL,
@@ -117,7 +427,7 @@ def init_db():
     )
     """)
 
-    cur.execute("""
+    con.execute("""
     CREATE TABLE IF NOT EXISTS evidence (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         session_id TEXT NOT NULL,
@@ -135,7 +445,7 @@ def init_db():
     )
     """)
 
-    cur.execute("""
+    con.execute("""
     CREATE TABLE IF NOT EXISTS equipment (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         name TEXT NOT NULL,
@@ -143,7 +453,7 @@ def init_db():
     )
     """)
 
-    cur.execute("""
+    con.execute("""
     CREATE TABLE IF NOT EXISTS equipment_log (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         session_id TEXT NOT NULL,
@@ -156,7 +466,7 @@ def init_db():
     )
     """)
 
-    cur.execute("""
+    con.execute("""
     CREATE TABLE IF NOT EXISTS tracker (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         session_id TEXT NOT NULL,
@@ -167,16 +477,381 @@ def init_db():
     )
     """)
 
-    con.commit()
-
     # seed equipment if empty
-    cur.execute("SELECT COUNT(*) as c FROM equipment")
-    if cur.fetchone()["c"] == 0:
+    if con.execute("SELECT COUNT(*) as c FROM equipment").fetchone()["c"] == 0:
         for item in DEFAULT_EQUIPMENT:
-            cur.execute("INSERT OR IGNORE INTO equipment(name, gear_id) VALUES (?,?)", (item["name"], item["id"]))
-        con.commit()
+            con.execute("INSERT OR IGNORE INTO equipment(name, gear_id) VALUES (?,?)", (item["name"], item["id"]))
+
+
+def _m002_session_indexes(con: sqlite3.Connection):
+    # every per-session read filters on session_id and orders by time (or team label)
+    con.execute("CREATE INDEX IF NOT EXISTS idx_logs_session_created ON logs(session_id, created_at)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_events_session_created ON events(session_id, created_at)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_evidence_session_created ON evidence(session_id, created_at)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_equipment_log_session_at ON equipment_log(session_id, at)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_tracker_session_team ON tracker(session_id, team_label)")
+
+
+def _m003_evidence_counters(con: sqlite3.Connection):
+    con.execute("""
+    CREATE TABLE IF NOT EXISTS evidence_counters (
+        session_id TEXT PRIMARY KEY,
+        last_value INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+    # continue numbering where the old COUNT(*)+1 scheme left off
+    con.execute("""
+    INSERT OR IGNORE INTO evidence_counters(session_id, last_value)
+    SELECT session_id, COUNT(*) FROM evidence GROUP BY session_id
+    """)
+
+
+def _m004_normalized_tags(con: sqlite3.Connection):
+    # logs.tags / events.tags (JSON) stay in place and are still written, for older readers
+    con.execute("""
+    CREATE TABLE IF NOT EXISTS tags (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    )
+    """)
+    for entity, (table, col) in TAG_TABLES.items():
+        con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            {col} INTEGER NOT NULL,
+            tag_id INTEGER NOT NULL,
+            PRIMARY KEY ({col}, tag_id)
+        ) WITHOUT ROWID
+        """)
+        con.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_tag ON {table}(tag_id, {col})")
+
+        for row in con.execute(f"SELECT id, tags FROM {entity} WHERE tags IS NOT NULL AND tags != '[]'").fetchall():
+            try:
+                names = json.loads(row["tags"])
+            except ValueError:
+                continue
+            set_tags(con, entity, row["id"], names)
+
+
+def _m005_epoch_ms_columns(con: sqlite3.Connection):
+    # (table, display column, ms column); the display strings are local time
+    for table, text_col, ms_col in (
+        ("sessions", "started_at", "started_ms"),
+        ("logs", "created_at", "created_ms"),
+        ("events", "created_at", "created_ms"),
+        ("evidence", "created_at", "created_ms"),
+        ("equipment_log", "at", "at_ms"),
+    ):
+        con.execute(f"ALTER TABLE {table} ADD COLUMN {ms_col} INTEGER")
+        con.execute(
+            f"UPDATE {table} SET {ms_col} = CAST(strftime('%s', {text_col}, 'utc') AS INTEGER) * 1000"
+        )
+
+    # the ms indexes replace the string-ordered ones from migration 2
+    con.execute("DROP INDEX IF EXISTS idx_logs_session_created")
+    con.execute("DROP INDEX IF EXISTS idx_events_session_created")
+    con.execute("DROP INDEX IF EXISTS idx_evidence_session_created")
+    con.execute("DROP INDEX IF EXISTS idx_equipment_log_session_at")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_logs_session_created_ms ON logs(session_id, created_ms)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_events_session_created_ms ON events(session_id, created_ms)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_evidence_session_created_ms ON evidence(session_id, created_ms)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_equipment_log_session_at_ms ON equipment_log(session_id, at_ms)")
+
+
+def _m006_full_text_search(con: sqlite3.Connection):
+    # external-content FTS5 indexes over the base tables, kept in sync by triggers
+    for table, cols in FTS_COLUMNS.items():
+        fts = f"{table}_fts"
+        col_list = ", ".join(cols)
+        new_vals = ", ".join(f"new.{c}" for c in cols)
+        old_vals = ", ".join(f"old.{c}" for c in cols)
+        con.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            {col_list}, content='{table}', content_rowid='id', tokenize='porter unicode61 remove_diacritics 2'
+        )
+        """)
+        con.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts}(rowid, {col_list}) VALUES (new.id, {new_vals});
+        END
+        """)
+        con.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {col_list}) VALUES ('delete', old.id, {old_vals});
+        END
+        """)
+        con.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {col_list} ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {col_list}) VALUES ('delete', old.id, {old_vals});
+            INSERT INTO {fts}(rowid, {col_list}) VALUES (new.id, {new_vals});
+        END
+        """)
+        con.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def _m007_evidence_size_hash(con: sqlite3.Connection):
+    # filled in at copy time; rows ingested before this migration stay NULL
+    con.execute("ALTER TABLE evidence ADD COLUMN size_bytes INTEGER")
+    con.execute("ALTER TABLE evidence ADD COLUMN sha256 TEXT")
+
+
+def _m008_evidence_dedup(con: sqlite3.Connection):
+    con.execute("ALTER TABLE evidence ADD COLUMN quick_hash TEXT")
+    # Copies made before dedup existed may repeat within a session; the earliest keeps
+    # its hash so the unique index can be built, later ones just stop being match targets.
+    con.execute(
+        """
+        UPDATE evidence SET sha256 = NULL
+        WHERE sha256 IS NOT NULL AND id > (
+            SELECT MIN(e.id) FROM evidence e WHERE e.session_id = evidence.session_id AND e.sha256 = evidence.sha256
+        )
+        """
+    )
+    con.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_evidence_session_sha256 ON evidence(session_id, sha256) "
+        "WHERE sha256 IS NOT NULL"
+    )
+    con.execute("CREATE INDEX IF NOT EXISTS idx_evidence_size ON evidence(size_bytes) WHERE sha256 IS NOT NULL")
+
+
+def _m009_evidence_ingest_method(con: sqlite3.Connection):
+    # everything stored so far was streamed
+    con.execute("ALTER TABLE evidence ADD COLUMN ingest_method TEXT")
+    con.execute("UPDATE evidence SET ingest_method = 'copy'")
+    # deferred hashes are written back by code
+    con.execute("CREATE INDEX IF NOT EXISTS idx_evidence_session_code ON evidence(session_id, evidence_code)")
+
+
+def _m010_import_jobs(con: sqlite3.Connection):
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS import_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            created_ms INTEGER NOT NULL,
+            sources TEXT NOT NULL,               -- JSON list of files/folders to import
+            options TEXT NOT NULL,               -- JSON of the IngestJob settings
+            state TEXT NOT NULL DEFAULT 'running',   -- running / done / cancelled / failed
+            finished_ms INTEGER,
+            summary TEXT                         -- JSON counters from the last run
+        )
+        """
+    )
+    con.execute("CREATE INDEX IF NOT EXISTS idx_import_jobs_session ON import_jobs(session_id, id)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_import_jobs_state ON import_jobs(state)")
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS import_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id INTEGER NOT NULL REFERENCES import_jobs(id),
+            path TEXT NOT NULL,
+            state TEXT NOT NULL DEFAULT 'pending',   -- pending / copying / done / failed
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_try_ms INTEGER,
+            error TEXT,
+            evidence_code TEXT,                  -- reserved when copying starts, reused on resume
+            detail TEXT,                         -- e.g. 'duplicate'
+            UNIQUE(job_id, path)
+        )
+        """
+    )
+    con.execute("CREATE INDEX IF NOT EXISTS idx_import_items_job_state ON import_items(job_id, state)")
+
+
+def _m011_watch_folders(con: sqlite3.Connection):
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS watch_folders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            path TEXT NOT NULL,
+            options TEXT NOT NULL,               -- JSON of the IngestJob settings for new files
+            poll_seconds REAL NOT NULL,
+            enabled INTEGER NOT NULL DEFAULT 1,
+            created_ms INTEGER NOT NULL,
+            last_scan_ms INTEGER,
+            files_seen INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            UNIQUE(session_id, path)
+        )
+        """
+    )
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS watch_files (
+            folder_id INTEGER NOT NULL REFERENCES watch_folders(id),
+            path TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            seen_ms INTEGER NOT NULL,
+            PRIMARY KEY (folder_id, path)
+        ) WITHOUT ROWID
+        """
+    )
+
+
+def _m012_versions_and_settling(con: sqlite3.Connection):
+    # a file re-imported from the same place after changing becomes the next version
+    con.execute("ALTER TABLE evidence ADD COLUMN source_path TEXT")
+    con.execute("ALTER TABLE evidence ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_evidence_session_source ON evidence(session_id, source_path)")
+    # a literal: the schema must not depend on the environment; WatchRepo.save always passes the setting
+    con.execute("ALTER TABLE watch_folders ADD COLUMN quiet_seconds REAL NOT NULL DEFAULT 5")
+
+
+def _m013_scan_cache(con: sqlite3.Connection):
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS scan_dirs (
+            path TEXT PRIMARY KEY,
+            mtime_ns INTEGER NOT NULL,
+            files TEXT NOT NULL,                 -- JSON list of file names
+            subdirs TEXT NOT NULL                -- JSON list of subdirectory names
+        ) WITHOUT ROWID
+        """
+    )
+
+
+def _m014_media_metadata(con: sqlite3.Connection):
+    # read from the file's own headers at ingest; NULL where the format doesn't say
+    for column in ("captured_ms", "duration_ms", "width", "height", "sample_rate"):
+        con.execute(f"ALTER TABLE evidence ADD COLUMN {column} INTEGER")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_evidence_session_captured ON evidence(session_id, captured_ms)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_evidence_session_duration ON evidence(session_id, duration_ms)")
+
+
+def _m015_evidence_stats(con: sqlite3.Connection):
+    # per-session, per-type totals for the library header, so it never has to COUNT(*) a big session
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS evidence_stats (
+            session_id TEXT NOT NULL,
+            type TEXT NOT NULL,
+            files INTEGER NOT NULL DEFAULT 0,
+            bytes INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (session_id, type)
+        ) WITHOUT ROWID
+        """
+    )
+    con.execute(
+        """
+        INSERT OR REPLACE INTO evidence_stats(session_id, type, files, bytes)
+        SELECT session_id, type, COUNT(*), COALESCE(SUM(size_bytes), 0) FROM evidence GROUP BY session_id, type
+        """
+    )
+    add = """
+        INSERT INTO evidence_stats(session_id, type, files, bytes) VALUES (new.session_id, new.type, 1, COALESCE(new.size_bytes, 0))
+        ON CONFLICT(session_id, type) DO UPDATE SET files = files + 1, bytes = bytes + excluded.bytes;
+    """
+    remove = """
+        UPDATE evidence_stats SET files = files - 1, bytes = bytes - COALESCE(old.size_bytes, 0)
+        WHERE session_id = old.session_id AND type = old.type;
+    """
+    con.execute(f"CREATE TRIGGER IF NOT EXISTS evidence_stats_ai AFTER INSERT ON evidence BEGIN {add} END")
+    con.execute(f"CREATE TRIGGER IF NOT EXISTS evidence_stats_ad AFTER DELETE ON evidence BEGIN {remove} END")
+    con.execute(
+        f"CREATE TRIGGER IF NOT EXISTS evidence_stats_au AFTER UPDATE OF session_id, type, size_bytes ON evidence "
+        f"BEGIN {remove} {add} END"
+    )
+    # type filter of the paginated library
+    con.execute("CREATE INDEX IF NOT EXISTS idx_evidence_session_type_created_ms ON evidence(session_id, type, created_ms)")
+
+
+def _m016_evidence_linked_event(con: sqlite3.Connection):
+    # the timeline looks up the evidence attached to the events it shows
+    con.execute(
+        "CREATE INDEX IF NOT EXISTS idx_evidence_linked_event ON evidence(linked_event_id) "
+        "WHERE linked_event_id IS NOT NULL"
+    )
+
+
+def _m017_import_item_stored_path(con: sqlite3.Connection):
+    # where an item's file is being placed, so a resumed move can find files it already renamed
+    con.execute("ALTER TABLE import_items ADD COLUMN stored_path TEXT")
+
+
+def _m018_evidence_size_unhashed(con: sqlite3.Connection):
+    # rows placed without copying carry only a quick hash until their deferred hash lands;
+    # a re-import in that window has to find them by size too
+    con.execute("DROP INDEX IF EXISTS idx_evidence_size")
+    con.execute(
+        "CREATE INDEX IF NOT EXISTS idx_evidence_size_hashed ON evidence(size_bytes) "
+        "WHERE sha256 IS NOT NULL OR quick_hash IS NOT NULL"
+    )
+
+
+def _m019_evidence_media_indexes(con: sqlite3.Connection):
+    # per-session filters on resolution and sample rate; formats without them stay out of the index
+    con.execute(
+        "CREATE INDEX IF NOT EXISTS idx_evidence_session_dimensions ON evidence(session_id, width, height) "
+        "WHERE width IS NOT NULL"
+    )
+    con.execute(
+        "CREATE INDEX IF NOT EXISTS idx_evidence_session_sample_rate ON evidence(session_id, sample_rate) "
+        "WHERE sample_rate IS NOT NULL"
+    )
+
+
+def _m020_import_job_history(con: sqlite3.Connection):
+    # the import history shows these instead of parsing sources and counting items on every rerun;
+    # item_counts is JSON (state -> files), written as a job stops. Jobs now also end 'partial'
+    # when some of their files failed for good.
+    con.execute("ALTER TABLE import_jobs ADD COLUMN source_label TEXT")
+    con.execute("ALTER TABLE import_jobs ADD COLUMN item_counts TEXT")
+    for job_id, sources in con.execute("SELECT id, sources FROM import_jobs").fetchall():
+        con.execute("UPDATE import_jobs SET source_label = ? WHERE id = ?", (import_label(json.loads(sources)), job_id))
+    con.execute(
+        """
+        UPDATE import_jobs SET item_counts = (
+            SELECT json_group_object(state, n) FROM (
+                SELECT state, COUNT(*) AS n FROM import_items WHERE job_id = import_jobs.id GROUP BY state
+            )
+        )
+        WHERE state != 'running'
+        """
+    )
+
+
+MIGRATIONS = [
+    (1, _m001_base_schema),
+    (2, _m002_session_indexes),
+    (3, _m003_evidence_counters),
+    (4, _m004_normalized_tags),
+    (5, _m005_epoch_ms_columns),
+    (6, _m006_full_text_search),
+    (7, _m007_evidence_size_hash),
+    (8, _m008_evidence_dedup),
+    (9, _m009_evidence_ingest_method),
+    (10, _m010_import_jobs),
+    (11, _m011_watch_folders),
+    (12, _m012_versions_and_settling),
+    (13, _m013_scan_cache),
+    (14, _m014_media_metadata),
+    (15, _m015_evidence_stats),
+    (16, _m016_evidence_linked_event),
+    (17, _m017_import_item_stored_path),
+    (18, _m018_evidence_size_unhashed),
+    (19, _m019_evidence_media_indexes),
+    (20, _m020_import_job_history),
+]
+
+def migrate(db: Database) -> int:
+    with db.transaction() as con:
+        version = con.execute("PRAGMA user_version").fetchone()[0]
+        for number, step in MIGRATIONS:
+            if number <= version:
+                continue
+            step(con)
+            con.execute(f"PRAGMA user_version = {number}")
+            version = number
+    return version
 
-    con.close()
+
+@st.cache_resource(show_spinner=False)
+def get_db() -> Database:
+    db = Database(DB_PATH)
+    migrate(db)
+    return db
 
 def get_session_folder(session_id: str) -> Path:
     p = SESSIONS_DIR / session_id
@@ -185,54 +860,134 @@ def get_session_folder(session_id: str) -> Path:
     (p / "reports").mkdir(parents=True, exist_ok=True)
     return p
 
+@st.cache_resource(show_spinner=False)
+def get_repos() -> Repos:
+    return Repos(get_db())
+
 def create_session(location: str = "", notes: str = "") -> str:
-    con = connect_db()
     started = now_local()
     session_id = started.strftime("%Y%m%d_%H%M%S")
-    con.execute(
-        "INSERT INTO sessions(session_id, started_at, location, notes) VALUES (?,?,?,?)",
-        (session_id, fmt_ts(started), location.strip() or None, notes.strip() or None),
-    )
-    con.commit()
-    con.close()
+    get_writer().submit(lambda con: get_repos().sessions.insert(
+        con, session_id, fmt_ts(started), to_ms(started), location.strip() or None, notes.strip() or None,
+    )).result()
     get_session_folder(session_id)
     return session_id
 
 def end_session(session_id: str):
-    con = connect_db()
-    con.execute("UPDATE sessions SET ended_at = ? WHERE session_id = ?", (fmt_ts(now_local()), session_id))
-    con.commit()
-    con.close()
-
-def fetchone(query: str, params: Tuple = ()) -> Optional[sqlite3.Row]:
-    con = connect_db()
-    cur = con.execute(query, params)
-    row = cur.fetchone()
-    con.close()
-    return row
-
-def fetchall(query: str, params: Tuple = ()) -> List[sqlite3.Row]:
-    con = connect_db()
-    cur = con.execute(query, params)
-    rows = cur.fetchall()
-    con.close()
-    return rows
-
-def execute(query: str, params: Tuple = ()):
-    con = connect_db()
-    con.execute(query, params)
-    con.commit()
-    con.close()
-
-def next_evidence_counter(session_id: str) -> int:
-    row = fetchone("SELECT COUNT(*) as c FROM evidence WHERE session_id = ?", (session_id,))
-    return int(row["c"]) + 1
-
-def evidence_code_for(session_id: str, ev_type: str) -> str:
-    started = fetchone("SELECT started_at FROM sessions WHERE session_id = ?", (session_id,))
-    date_part = datetime.strptime(started["started_at"], "%Y-%m-%d %H:%M:%S").strftime("%Y%m%d")
-    counter = next_evidence_counter(session_id)
-    return f"{date_part}_{counter:04d}_{ev_type.upper()}"
+    ended = fmt_ts(now_local())
+    get_writer().submit(lambda con: get_repos().sessions.end(con, session_id, ended)).result()
+
+
+# =========================
+# Write-behind queue
+# =========================
+WriteWork = Union[str, Callable[[sqlite3.Connection], Any]]
+
+class WriteQueue:
+    """
+    Dedicated writer thread fed by a bounded queue. Each submitted write is either
+    an SQL string (with params) or a callable taking the connection; the writer
+    drains whatever is waiting and commits it as one group, so a button press
+    during a busy import waits for at most one group commit instead of queueing
+    on the database lock. A failing write is rolled back to its own savepoint
+    and only fails its own future.
+    """
+
+    def __init__(self, db: Database, maxsize: int = WRITE_QUEUE_SIZE, max_group: int = WRITE_GROUP_MAX):
+        self.db = db
+        self.max_group = max_group
+        self._queue: "queue.Queue[Tuple[WriteWork, Tuple, Future]]" = queue.Queue(maxsize)
+        self._thread = threading.Thread(target=self._run, name="basecamp-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, work: WriteWork, params: Tuple = ()) -> Future:
+        fut: Future = Future()
+        self._queue.put((work, params, fut))
+        return fut
+
+    def _run(self):
+        while True:
+            group = [self._queue.get()]
+            while len(group) < self.max_group:
+                try:
+                    group.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._commit(group)
+
+    def _commit(self, group: List[Tuple[WriteWork, Tuple, Future]]):
+        outcomes = []
+        try:
+            with self.db.transaction() as con:
+                for work, params, fut in group:
+                    if not fut.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        with self.db.transaction():
+                            result = con.execute(work, params).lastrowid if isinstance(work, str) else work(con)
+                        outcomes.append((fut, result, None))
+                    except Exception as e:
+                        outcomes.append((fut, None, e))
+        except Exception as e:
+            # the group commit itself failed: nothing in it was written
+            for _, _, fut in group:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for fut, result, err in outcomes:
+            if err is not None:
+                fut.set_exception(err)
+            else:
+                fut.set_result(result)
+
+
+@st.cache_resource(show_spinner=False)
+def get_writer() -> WriteQueue:
+    return WriteQueue(get_db())
+
+def queue_write(work: WriteWork, params: Tuple = (), wait: float = WRITE_ACK_TIMEOUT) -> Future:
+    """
+    Hands a write to the writer thread. Waits up to `wait` seconds for the commit
+    (so the following st.rerun() normally shows it) and re-raises if it failed.
+    """
+    fut = get_writer().submit(work, params)
+    try:
+        fut.result(timeout=wait)
+    except FutureTimeout:
+        pass
+    return fut
+
+def evidence_codes_for(session_id: str, ev_types: List[str]) -> List[str]:
+    if not ev_types:
+        return []
+    started = get_repos().sessions.get(session_id)
+    date_part = started.started_at[:10].replace("-", "")  # "%Y-%m-%d ..." -> "%Y%m%d"
+    first = get_writer().submit(lambda con: EvidenceRepo.reserve_counters(con, session_id, len(ev_types))).result()
+    return [f"{date_part}_{first + i:04d}_{t.upper()}" for i, t in enumerate(ev_types)]
+
+# table -> columns indexed for full-text search (see migration 6)
+FTS_COLUMNS = {
+    "logs": ("text",),
+    "events": ("title", "room", "camera_label"),
+    "evidence": ("description", "original_name"),
+}
+
+def fts_query(text: str) -> str:
+    """Turns free text into an FTS5 query: every word must match, the last one as a prefix."""
+    words = re.findall(r"\w+", text)
+    if not words:
+        return ""
+    quoted = [f'"{w}"' for w in words]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+def search_all(text: str, session_id: Optional[str] = None, limit: int = 20,
+               offset: int = 0) -> Tuple[int, List[SearchHitRecord]]:
+    """Ranked notes/events/evidence matching `text` (session_id=None searches every session)."""
+    q = fts_query(text)
+    if not q:
+        return 0, []
+    return get_repos().search.search(q, session_id, limit, offset)
 
 def detect_type_from_name(name: str) -> str:
     ext = Path(name).suffix.lower()
@@ -247,20 +1002,1691 @@ def load_logo_bytes(path: Path) -> Optional[bytes]:
     return None
 
 
+# =========================
+# Media metadata
+# =========================
+# Everything here reads headers only: Pillow parses up to the first image data
+# without decoding it, wave/aifc stop at the sample data, and MP4/MOV atoms are
+# walked by seeking from one box header to the next (moov is often at the end,
+# after gigabytes of mdat).
+MP4_EXTS = {".mp4", ".mov", ".m4a", ".m4v", ".3gp"}
+EXIF_FORMATS = {"JPEG", "MPO", "TIFF"}  # EXIF sits in the header; other formats would need a full read
+EXIF_IFD = 0x8769
+EXIF_DATETIME = 0x0132
+EXIF_DATETIME_ORIGINAL = 0x9003
+MP4_EPOCH_OFFSET = 2082844800  # seconds from 1904-01-01 (QuickTime epoch) to 1970-01-01
+
+
+class MediaInfo:
+    __slots__ = ("captured_ms", "duration_ms", "width", "height", "sample_rate")
+
+    def __init__(self):
+        self.captured_ms = None  # when the camera/recorder says it was taken
+        self.duration_ms = None
+        self.width = None
+        self.height = None
+        self.sample_rate = None
+
+    def values(self) -> Tuple:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+
+def _exif_ms(stamp: Any) -> Optional[int]:
+    # "YYYY:MM:DD HH:MM:SS" in the camera's local time; unset clocks write blanks or zeros
+    try:
+        return to_ms(datetime.strptime(str(stamp).strip("\x00 ")[:19], "%Y:%m:%d %H:%M:%S"))
+    except (ValueError, OverflowError, OSError):
+        return None
+
+
+def _image_info(path: Path, info: MediaInfo):
+    if Image is None:
+        return
+    with Image.open(path) as img:
+        info.width, info.height = img.size
+        if img.format in EXIF_FORMATS:
+            exif = img.getexif()
+            info.captured_ms = _exif_ms(exif.get_ifd(EXIF_IFD).get(EXIF_DATETIME_ORIGINAL) or exif.get(EXIF_DATETIME))
+
+
+def _audio_info(path: Path, info: MediaInfo, module: Any):
+    with module.open(str(path), "rb") as f:
+        rate, frames = f.getframerate(), f.getnframes()
+    if rate:
+        info.sample_rate = rate
+        info.duration_ms = frames * 1000 // rate
+
+
+def _wav_layout(f: BinaryIO) -> Optional[Tuple[int, int, int, int, int, int]]:
+    """
+    (format tag, channels, sample rate, bits per sample, data offset, data bytes) of an
+    open RIFF/WAVE file, found by skipping from chunk header to chunk header; None if
+    it isn't one.
+    """
+    riff, _, kind = struct.unpack("<4sI4s", f.read(12))
+    if riff != b"RIFF" or kind != b"WAVE":
+        return None
+    fmt = None
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            return None
+        chunk, size = struct.unpack("<4sI", header)
+        if chunk == b"fmt ":
+            body = f.read(size)
+            tag, channels, rate, _, _, bits = struct.unpack("<HHIIHH", body[:16])
+            if tag == 0xFFFE and len(body) >= 26:  # WAVE_FORMAT_EXTENSIBLE: the real tag starts the subformat GUID
+                (tag,) = struct.unpack("<H", body[24:26])
+            fmt = (tag, channels, rate, bits)
+            f.seek(size & 1, os.SEEK_CUR)
+        elif chunk == b"data":
+            if fmt is None:
+                return None
+            # recorders that were cut off mid-take leave the size unset or too large
+            size = min(size, os.fstat(f.fileno()).st_size - f.tell())
+            return (*fmt, f.tell(), size)
+        else:
+            f.seek(size + (size & 1), os.SEEK_CUR)
+
+
+def _riff_info(path: Path, info: MediaInfo):
+    # wave only knows integer PCM; float and WAVE_FORMAT_EXTENSIBLE recorders still have a fmt chunk
+    with open(path, "rb") as f:
+        layout = _wav_layout(f)
+    if layout is None:
+        return
+    _, channels, rate, bits, _, data_bytes = layout
+    info.sample_rate = rate
+    frame_bytes = channels * bits // 8
+    if rate and frame_bytes:
+        info.duration_ms = data_bytes // frame_bytes * 1000 // rate
+
+
+def _mp4_boxes(f: BinaryIO, start: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    """(type, body offset, end offset) of each box between start and end."""
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        size, kind = struct.unpack(">I4s", f.read(8))
+        body = pos + 8
+        if size == 1:  # 64-bit size follows the type
+            (size,) = struct.unpack(">Q", f.read(8))
+            body += 8
+        elif size == 0:  # runs to the end of the enclosing box
+            size = end - pos
+        if pos + size < body:
+            return
+        yield kind, body, pos + size
+        pos += size
+
+
+def _mp4_info(path: Path, info: MediaInfo):
+    with open(path, "rb") as f:
+        for kind, body, end in _mp4_boxes(f, 0, os.fstat(f.fileno()).st_size):
+            if kind != b"moov":
+                continue
+            for kind, body, end in _mp4_boxes(f, body, end):
+                if kind == b"mvhd":
+                    f.seek(body)
+                    head = f.read(32)
+                    if head[0] == 1:
+                        created, _, timescale, duration = struct.unpack(">QQIQ", head[4:32])
+                    else:
+                        created, _, timescale, duration = struct.unpack(">IIII", head[4:20])
+                    if timescale:
+                        info.duration_ms = duration * 1000 // timescale
+                    if created > MP4_EPOCH_OFFSET:
+                        info.captured_ms = (created - MP4_EPOCH_OFFSET) * 1000
+                elif kind == b"trak" and info.width is None:
+                    for kind, body, _ in _mp4_boxes(f, body, end):
+                        if kind == b"tkhd":
+                            f.seek(body)
+                            head = f.read(96)
+                            # width/height are 16.16 fixed point after the matrix
+                            width, height = struct.unpack(">II", head[88:96] if head[0] == 1 else head[76:84])
+                            if width:
+                                info.width, info.height = width >> 16, height >> 16
+            return
+
+
+def read_media_info(path: Path) -> MediaInfo:
+    """Capture time, duration, dimensions and sample rate, as far as path's headers tell."""
+    info = MediaInfo()
+    ext = path.suffix.lower()
+    try:
+        if ext in MP4_EXTS:
+            _mp4_info(path, info)
+        elif ext == ".wav":
+            try:
+                _audio_info(path, info, wave)
+            except wave.Error:
+                _riff_info(path, info)
+        elif ext in (".aif", ".aiff", ".aifc") and aifc is not None:
+            _audio_info(path, info, aifc)
+        elif EXT_TYPE.get(ext) == "PHOTO" or ext in (".tif", ".tiff", ".gif", ".bmp"):
+            _image_info(path, info)
+    except Exception:
+        # metadata is a bonus: a truncated or odd file still gets imported
+        pass
+    return info
+
+
+# =========================
+# Waveform peaks
+# =========================
+# A .peaks file is a header, the pair count of each level, then the levels' int8
+# (min, max) pairs back to back, finest first. Drawing a waveform reads one level
+# (a few KB), never the audio.
+PEAKS_HEADER = struct.Struct("<4sHHII")  # magic, version, levels, sample rate, frames per pair at level 0
+PEAKS_MAGIC = b"BCPK"
+
+
+def peaks_path(stored_path: Path) -> Path:
+    return stored_path.with_name(stored_path.name + ".peaks")
+
+
+def _samples(raw: bytes, tag: int, bits: int) -> "np.ndarray":
+    """Interleaved WAV samples as float32 in [-1, 1]."""
+    if tag == 3:  # IEEE float
+        return np.frombuffer(raw, "<f4" if bits == 32 else "<f8").astype(np.float32)
+    if bits == 8:  # unsigned
+        return (np.frombuffer(raw, np.uint8).astype(np.float32) - 128) / 128
+    if bits == 24:
+        b = np.frombuffer(raw, np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = (b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)) << 8 >> 8  # sign-extend
+        return ints.astype(np.float32) / (1 << 23)
+    return np.frombuffer(raw, "<i2" if bits == 16 else "<i4").astype(np.float32) / (1 << (bits - 1))
+
+
+def compute_peaks(path: Path) -> Optional[Tuple[int, List["np.ndarray"]]]:
+    """
+    (sample rate, levels) for a WAV file: level n holds one int8 (min, max) pair per
+    PEAKS_BASE_FRAMES * 4**n frames, all channels mixed. Samples are read
+    PEAKS_CHUNK_FRAMES at a time, so memory stays flat however long the take.
+    None if path isn't PCM or float WAV.
+    """
+    if np is None:
+        return None
+    with open(path, "rb") as f:
+        layout = _wav_layout(f)
+        if layout is None:
+            return None
+        tag, channels, rate, bits, offset, data_bytes = layout
+        if tag not in (1, 3) or bits not in ((8, 16, 24, 32) if tag == 1 else (32, 64)) or not channels:
+            return None
+        frame_bytes = channels * bits // 8
+        remaining = data_bytes // frame_bytes * frame_bytes
+        f.seek(offset)
+        mins, maxs = [], []
+        while remaining > 0:
+            raw = f.read(min(PEAKS_CHUNK_FRAMES * frame_bytes, remaining))
+            raw = raw[:len(raw) // frame_bytes * frame_bytes]
+            if not raw:
+                break
+            remaining -= len(raw)
+            frames = _samples(raw, tag, bits).reshape(-1, channels)
+            starts = np.arange(0, len(frames), PEAKS_BASE_FRAMES)
+            mins.append(np.minimum.reduceat(frames.min(axis=1), starts))
+            maxs.append(np.maximum.reduceat(frames.max(axis=1), starts))
+    if not mins:
+        return rate, [np.zeros((0, 2), np.int8)] * PEAKS_LEVELS
+    pairs = np.stack([np.concatenate(mins), np.concatenate(maxs)], axis=1)
+    level = np.clip(np.round(pairs * 127), -127, 127).astype(np.int8)
+    levels = [level]
+    for _ in range(PEAKS_LEVELS - 1):
+        starts = np.arange(0, len(level), 4)
+        level = np.stack([np.minimum.reduceat(level[:, 0], starts), np.maximum.reduceat(level[:, 1], starts)], axis=1)
+        levels.append(level)
+    return rate, levels
+
+
+def write_peaks(stored_path: Path) -> bool:
+    """Writes the .peaks file for a stored WAV; False (and no file) for anything else."""
+    try:
+        peaks = compute_peaks(stored_path)
+    except (OSError, ValueError, struct.error):
+        return False
+    if peaks is None:
+        return False
+    rate, levels = peaks
+    dst = peaks_path(stored_path)
+    tmp = dst.with_name(dst.name + ".part")
+    try:
+        with open(tmp, "wb") as f:
+            f.write(PEAKS_HEADER.pack(PEAKS_MAGIC, 1, len(levels), rate, PEAKS_BASE_FRAMES))
+            f.write(struct.pack(f"<{len(levels)}I", *(len(level) for level in levels)))
+            for level in levels:
+                f.write(level.tobytes())
+        os.replace(tmp, dst)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+        return False
+    return True
+
+
+def read_peaks(stored_path: Path, min_pairs: int) -> Optional["np.ndarray"]:
+    """The coarsest stored level with at least min_pairs pairs (else the finest); None without a .peaks file."""
+    if np is None:
+        return None
+    try:
+        with open(peaks_path(stored_path), "rb") as f:
+            magic, _, count, _, _ = PEAKS_HEADER.unpack(f.read(PEAKS_HEADER.size))
+            if magic != PEAKS_MAGIC:
+                return None
+            sizes = struct.unpack(f"<{count}I", f.read(4 * count))
+            pick = max([i for i, n in enumerate(sizes) if n >= min_pairs] or [0])
+            f.seek(2 * sum(sizes[:pick]), os.SEEK_CUR)
+            return np.frombuffer(f.read(2 * sizes[pick]), np.int8).reshape(-1, 2)
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def waveform_svg(stored_path: Path, width: int = 600, height: int = 60) -> Optional[str]:
+    """The min/max envelope of a stored WAV as an SVG, drawn from its .peaks file."""
+    level = read_peaks(stored_path, width)
+    if level is None or not len(level):
+        return None
+    if len(level) > width:
+        starts = np.linspace(0, len(level), width, endpoint=False).astype(int)
+        level = np.stack([np.minimum.reduceat(level[:, 0], starts), np.maximum.reduceat(level[:, 1], starts)], axis=1)
+    mid = height / 2
+    top = mid - level[:, 1].astype(np.float32) / 127 * mid
+    bottom = mid - level[:, 0].astype(np.float32) / 127 * mid
+    xs = np.arange(len(level)) + 0.5
+    points = " ".join(f"{x:.1f},{y:.1f}" for x, y in zip(np.concatenate([xs, xs[::-1]]),
+                                                          np.concatenate([top, bottom[::-1]])))
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {len(level)} {height}" '
+            f'preserveAspectRatio="none" width="{width}" height="{height}">'
+            f'<line x1="0" y1="{mid}" x2="{len(level)}" y2="{mid}" stroke="#9aa5b1" stroke-width="0.5"/>'
+            f'<polygon points="{points}" fill="#3b82c4"/></svg>')
+
+
+# =========================
+# Ingest pipeline
+# =========================
+class IngestSummary:
+    __slots__ = ("ingested", "duplicates", "linked", "zero_copy", "bytes_saved", "restored")
+
+    def __init__(self):
+        self.ingested = 0
+        self.duplicates = 0
+        self.linked = 0
+        self.zero_copy = 0
+        self.bytes_saved = 0
+        self.restored = 0
+
+    def describe(self) -> str:
+        text = f"Ingested {self.ingested} file(s)."
+        if self.zero_copy:
+            text += f" {self.zero_copy} placed without copying."
+        if self.linked:
+            text += f" {self.linked} linked to copies from other sessions."
+        if self.duplicates or self.bytes_saved:
+            text += f" {self.duplicates} duplicates skipped ({fmt_bytes(self.bytes_saved)} saved)."
+        if self.restored:
+            text += f" {self.restored} restored evidence whose stored file had gone missing."
+        return text
+
+
+def find_duplicate(session_id: str, path: Path, size: int) -> Optional[EvidenceRecord]:
+    """
+    Stored evidence with the same content as path, preferring this session.
+    Size is free, the quick hash reads 128 KiB, and only a quick-hash match
+    pays for a full read.
+    """
+    candidates = get_repos().evidence.same_size(size, session_id)
+    if not candidates:
+        return None
+    quick = quick_hash(path, size)
+    # rows hashed before the quick hash existed can only be ruled out by the full hash
+    candidates = [c for c in candidates if c.quick_hash in (quick, None)]
+    if not candidates:
+        return None
+    sha256 = hash_file(path)
+    for c in candidates:
+        stored = Path(c.stored_path)
+        if not stored.is_file():
+            continue
+        if c.sha256 is None:
+            # placed without streaming and still waiting for its deferred hash
+            try:
+                c.sha256 = hash_file(stored)
+            except OSError:
+                continue
+        if c.sha256 == sha256:
+            return c
+    return None
+
+
+_PLACE = {"reflink": reflink, "hardlink": os.link, "rename": os.rename}
+
+def store_file(src: Source, dst: Path, mode: str = "copy", existing: Optional[Path] = None,
+               progress: Optional[Callable[[int], None]] = None) -> Tuple[str, int, Optional[str]]:
+    """
+    Puts src's content at dst and returns (method, size, sha256). An already stored
+    copy with the same content (existing) is cloned or hard-linked first; then src
+    is placed by the methods INGEST_MODES[mode] allows, and only if none of them
+    work on this pair of paths is it streamed through copy_with_hash. sha256 is
+    None unless the bytes were streamed. A stream src is always streamed.
+    """
+    attempts = []
+    if existing is not None:
+        attempts += [("reflink", existing), ("hardlink", existing)]
+    if isinstance(src, Path):
+        attempts += [(method, src) for method in INGEST_MODES[mode]]
+    for method, source in attempts:
+        try:
+            _PLACE[method](source, dst)
+            return method, dst.stat().st_size, None
+        except OSError:
+            continue
+    size, sha256 = copy_with_hash(src, dst, progress)
+    return "copy", size, sha256
+
+
+UPLOAD_PREFIX = "upload:"  # import_items.path of a browser upload: upload:<n>:<file name>
+
+def upload_key(n: int, name: str) -> str:
+    return f"{UPLOAD_PREFIX}{n}:{name}"
+
+def import_label(sources: List[str]) -> str:
+    """How the import history names a job's sources: the one path or upload, or how many."""
+    if len(sources) != 1:
+        return f"{len(sources)} files/folders"
+    source = sources[0]
+    return source.split(":", 2)[2] if source.startswith(UPLOAD_PREFIX) else source
+
+
+class IngestItem:
+    __slots__ = ("item_id", "path", "name", "stream", "attempts", "code", "size", "ev_type", "match",
+                 "stored_path", "adopted", "method", "sha256", "quick_hash", "media")
+
+    def __init__(self, record: ImportItemRecord, stream: Optional[BinaryIO] = None):
+        self.item_id = record.id
+        if record.path.startswith(UPLOAD_PREFIX):
+            self.path = None
+            self.name = record.path.split(":", 2)[2]
+        else:
+            self.path = Path(record.path)
+            self.name = self.path.name
+        self.stream = stream  # an upload's bytes; None once the upload is gone (e.g. after a restart)
+        self.attempts = record.attempts
+        self.code = record.evidence_code  # set when resuming an item that had started copying
+        self.size = 0
+        self.ev_type = None
+        self.match = None  # same content already stored by another session
+        # recorded when copying starts, so a resumed move can find the file it placed
+        self.stored_path = Path(record.stored_path) if record.stored_path else None
+        self.adopted = False  # already in place from an earlier run; only needs its hash
+        self.method = None
+        self.sha256 = None
+        self.quick_hash = None
+        self.media = None
+
+    @property
+    def source(self) -> Source:
+        return self.path if self.path is not None else self.stream
+
+
+_DONE = object()  # end-of-stream marker passed down the stage queues
+
+# positions in an evidence row tuple, which follows EvidenceRepo.INSERT_COLUMNS
+ROW_CODE, ROW_STORED_PATH, ROW_TYPE, ROW_SIZE, ROW_SHA256, ROW_QUICK_HASH, ROW_METHOD, ROW_SOURCE = (
+    EvidenceRepo.INSERT_COLUMNS.index(c)
+    for c in ("evidence_code", "stored_path", "type", "size_bytes", "sha256", "quick_hash",
+              "ingest_method", "source_path")
+)
+
+class IngestJob:
+    """
+    One import, run off the script thread as stages joined by bounded queues:
+
+        discovery -> filter -> copy workers -> metadata -> DB writer
+
+    Discovery expands folders and records every file in import_items; filter drops
+    already stored files and reserves evidence codes; copy workers stream files into
+    the session folder, workers_per_device at a time per source device (st_dev), so a
+    slow SD card and a local drop folder don't starve each other, and quick-hash
+    each placed file to drop content the job already placed; metadata workers read
+    media headers from the stored copy, plus the waveform peaks of a WAV; the writer commits rows in groups through the WriteQueue,
+    marking their items done in the same transaction. Full queues block the stage
+    feeding them.
+
+    Files that fail are retried in later passes with exponential backoff, up to
+    INGEST_MAX_ATTEMPTS. The job and its items live in the database, so after a
+    restart (or a Resume) a job with the same id carries on where it stopped; a file
+    a move had already renamed into place is adopted from there. A job that ends
+    with items still pending or copying is marked failed so it can be resumed.
+    Cancelling stops intake, but files already copied are still recorded.
+
+    uploads are Streamlit UploadedFiles (anything with name, getvalue() and file_id):
+    they are hashed and written straight into the session folder, with no temp copy.
+    Each job reads them through streams of its own, since the uploader hands the same
+    objects to every rerun. Their bytes only live in memory, so a resumed job reports
+    them as failed.
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        sources: List[Path],
+        ev_type_choice: str,
+        captured_by_val: Optional[str],
+        device: Optional[str],
+        room: Optional[str],
+        desc: Optional[str],
+        linked_event_id: Optional[int],
+        ignore_ext: Tuple[str, ...] = (),
+        mode: str = "copy",
+        workers_per_device: int = INGEST_WORKERS_PER_DEVICE,
+        commit_every: int = INGEST_COMMIT_EVERY,
+        job_id: Optional[int] = None,
+        uploads: Sequence[BinaryIO] = (),
+    ):
+        if mode not in INGEST_MODES:
+            raise ValueError(f"unknown ingest mode {mode!r}; expected one of {sorted(INGEST_MODES)}")
+        self.id = job_id
+        self.session_id = session_id
+        # getvalue() of an unmodified BytesIO shares its bytes, so this costs no copy
+        self._streams = {upload_key(n, up.name): io.BytesIO(up.getvalue()) for n, up in enumerate(uploads)}
+        self.upload_ids = {up.file_id for up in uploads}
+        self.sources: List[Union[Path, str]] = list(sources) + list(self._streams)
+        self.ev_type_choice = ev_type_choice
+        self.ignore_ext = sorted({e.lower() for e in ignore_ext})
+        self.mode = mode
+        self.workers_per_device = max(1, workers_per_device)
+        self.commit_every = max(1, commit_every)
+        # fixed column values for every row, in EvidenceRepo.INSERT_COLUMNS order
+        self.captured_by = captured_by_val
+        self.fields = (
+            (device or "").strip() or None,
+            (room or "").strip() or None,
+            (desc or "").strip() or None,
+            linked_event_id,
+        )
+        self.evidence_folder = get_session_folder(session_id) / "evidence"
+
+        self.summary = IngestSummary()
+        self.failed = 0
+        self.files_total = 0
+        self.files_done = 0
+        self.bytes_total = 0
+        self.bytes_done = 0
+        self.discovered = False
+        self.hashes_total = 0
+        self.hashes_done = 0
+        self.started = None
+        self.finished = None
+        self.error: Optional[BaseException] = None
+
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        # quick hash -> [sha256 (None until needed), stored path] of the files this job placed
+        self._seen: Dict[str, List[list]] = {}
+        self._seen_lock = threading.Lock()
+
+    def options(self) -> dict:
+        device, room, desc, linked_event_id = self.fields
+        return {
+            "ev_type_choice": self.ev_type_choice, "captured_by_val": self.captured_by, "device": device,
+            "room": room, "desc": desc, "linked_event_id": linked_event_id, "ignore_ext": self.ignore_ext,
+            "mode": self.mode, "workers_per_device": self.workers_per_device, "commit_every": self.commit_every,
+        }
+
+    @classmethod
+    def resume(cls, record: ImportJobRecord) -> "IngestJob":
+        sources = [p if p.startswith(UPLOAD_PREFIX) else Path(p) for p in json.loads(record.sources)]
+        job = cls(record.session_id, sources,
+                  job_id=record.id, **json.loads(record.options))
+        # counters carry over from the runs before
+        for name, value in json.loads(record.summary or "{}").items():
+            if name in IngestSummary.__slots__:
+                setattr(job.summary, name, value)
+        return job
+
+    # ---- control ----
+
+    def start(self) -> "IngestJob":
+        self.started = time.monotonic()
+        if self.id is None:
+            created = now_local()
+            sources = [str(p) for p in self.sources]
+            self.id = get_writer().submit(lambda con: ImportRepo.create_job(
+                con, self.session_id, fmt_ts(created), to_ms(created), sources, import_label(sources), self.options(),
+            )).result()
+        threading.Thread(target=self._run, name=f"ingest-{self.id}", daemon=True).start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    # ---- progress ----
+
+    def fraction(self) -> float:
+        with self._lock:
+            if self.bytes_total:
+                return min(1.0, self.bytes_done / self.bytes_total)
+            return 1.0 if self.done else 0.0
+
+    def status_line(self) -> str:
+        with self._lock:
+            elapsed = max(1e-6, (self.finished or time.monotonic()) - self.started)
+            files_rate = self.files_done / elapsed
+            bytes_rate = self.bytes_done / elapsed
+            parts = [
+                f"{self.files_done}/{self.files_total}{'' if self.discovered else '+'} files",
+                f"{files_rate:.1f} files/s",
+                f"{bytes_rate / 1e6:.1f} MB/s",
+            ]
+            if self.failed and not self.done:
+                parts.append(f"{self.failed} failed, retrying")
+            if self.hashes_total and not self.done:
+                parts.append(f"hashing {self.hashes_done}/{self.hashes_total}")
+            if self.done:
+                parts.append(f"took {elapsed:.0f}s")
+            elif self.discovered and bytes_rate > 0:
+                eta = int((self.bytes_total - self.bytes_done) / bytes_rate)
+                parts.append(f"ETA {eta // 60}:{eta % 60:02d}")
+            else:
+                parts.append("ETA —")
+        return " • ".join(parts)
+
+    def _tally(self, **deltas):
+        # counters named like an IngestSummary field go to the summary, the rest to the job
+        with self._lock:
+            for name, delta in deltas.items():
+                if hasattr(self.summary, name):
+                    setattr(self.summary, name, getattr(self.summary, name) + delta)
+                else:
+                    setattr(self, name, getattr(self, name) + delta)
+
+    def _summary(self, **pending) -> dict:
+        """The counters as saved on the job, plus deltas about to be committed but not tallied yet."""
+        with self._lock:
+            summary = {name: getattr(self.summary, name) + pending.get(name, 0) for name in IngestSummary.__slots__}
+            summary["failed"] = self.failed
+        return summary
+
+    def _abort(self, e: BaseException):
+        if self.error is None:
+            self.error = e
+        self._cancel.set()
+
+    def _consume(self, q: queue.Queue, handle: Callable[[Any], None], stop_on_cancel: bool = True):
+        """Feeds q's items to handle until _DONE; once cancelled, items are only drained."""
+        while True:
+            item = q.get()
+            if item is _DONE:
+                return
+            if stop_on_cancel and self._cancel.is_set():
+                continue
+            try:
+                handle(item)
+            except Exception as e:
+                self._abort(e)
+
+    def _fail(self, item: IngestItem, err: Exception, bytes_left: int = 0, retry: bool = True):
+        # backoff doubles per attempt: INGEST_RETRY_DELAY, 2x, 4x, ...
+        delay = INGEST_RETRY_DELAY * 2 ** item.attempts
+        next_try_ms = to_ms(now_local()) + int(delay * 1000) if retry else None
+        get_writer().submit(lambda con: ImportRepo.fail_item(con, item.item_id, str(err), next_try_ms)).result()
+        self._tally(failed=1, files_done=1, bytes_done=bytes_left)
+
+    # ---- passes ----
+
+    def _run(self):
+        try:
+            feed = self._discover
+            while True:
+                self._run_pass(feed)
+                if self._cancel.is_set():
+                    break
+                retry = get_repos().imports.retryable(self.id, INGEST_MAX_ATTEMPTS)
+                if not retry:
+                    break
+                wait_ms = min(r.next_try_ms for r in retry) - to_ms(now_local())
+                if self._cancel.wait(max(0, wait_ms) / 1000):
+                    break
+                now_ms = to_ms(now_local())
+                due = [r for r in retry if r.next_try_ms <= now_ms]
+                self._tally(failed=-len(due), files_done=-len(due), files_total=-len(due))
+                feed = lambda due=due: self._feed(due)
+            self._hash_deferred()
+        except Exception as e:
+            self._abort(e)
+        finally:
+            with self._lock:
+                self.finished = time.monotonic()
+            summary = self._summary()
+
+            def finish(con: sqlite3.Connection):
+                # counted on the writer, so every item update queued before this is in
+                counts = ImportRepo.count_items(con, self.id)
+                left = counts.get("pending", 0) + counts.get("copying", 0)
+                if left and self.error is None and not self._cancel.is_set():
+                    self.error = RuntimeError(f"{left} file(s) were left unfinished; resume the import to retry them")
+                if self.error is not None:
+                    state = "failed"
+                elif self._cancel.is_set():
+                    state = "cancelled"
+                else:
+                    state = "partial" if counts.get("failed") else "done"
+                ImportRepo.finish_job(con, self.id, state, to_ms(now_local()), summary, counts)
+
+            try:
+                get_writer().submit(finish).result()
+            except Exception:
+                pass
+            self._streams.clear()  # finished jobs are kept around; their uploads needn't be
+            self._done.set()
+
+    def _run_pass(self, feed: Callable[[], None]):
+        self._found: queue.Queue = queue.Queue(INGEST_QUEUE_SIZE)
+        self._copied: queue.Queue = queue.Queue(INGEST_QUEUE_SIZE)
+        self._stored: queue.Queue = queue.Queue(INGEST_QUEUE_SIZE)
+        self._pools = {}  # st_dev -> (queue, worker threads)
+
+        def discover():
+            try:
+                feed()
+            except Exception as e:
+                self._abort(e)
+            finally:
+                self._found.put(_DONE)
+
+        stages = [
+            threading.Thread(target=target, name=f"ingest-{self.id}-{name}", daemon=True)
+            for name, target in (("discover", discover), ("filter", self._filter),
+                                 ("metadata", self._metadata), ("writer", self._write))
+        ]
+        for t in stages:
+            t.start()
+        for t in stages:
+            t.join()
+
+    # ---- stages ----
+
+    def _discover(self):
+        batch = []
+        fed = set()
+        ignore = set(self.ignore_ext)
+        for src in self.sources:
+            if isinstance(src, str):
+                paths = [src]
+            elif src.is_dir():
+                paths = scan_tree(src, ignore_ext=ignore).files
+            elif src.suffix.lower() not in ignore and src.is_file():
+                paths = [str(src)]
+            else:
+                continue
+            for p in paths:
+                if self._cancel.is_set():
+                    break
+                batch.append(p)
+                if len(batch) >= INGEST_QUEUE_SIZE:
+                    fed |= self._record(batch)
+                    batch = []
+        fed |= self._record(batch)
+        # unfinished items the scan no longer finds, e.g. files a move had already renamed away
+        if not self._cancel.is_set():
+            self._feed([r for r in get_repos().imports.unfinished_items(self.id) if r.id not in fed])
+
+    def _record(self, paths: List[str]) -> set:
+        """Records paths and feeds their unfinished items; returns the ids fed."""
+        if not paths:
+            return set()
+        records = get_writer().submit(lambda con: ImportRepo.add_items(con, self.id, paths)).result()
+        # a resumed job sees its finished files again; only unfinished ones go on
+        records = [r for r in records if r.state in ("pending", "copying")]
+        self._feed(records)
+        return {r.id for r in records}
+
+    def _feed(self, records: List[ImportItemRecord]):
+        self._tally(files_total=len(records))
+        for r in records:
+            self._found.put(IngestItem(r, self._streams.get(r.path)))
+
+    def _filter(self):
+        # takes whatever discovery has queued so codes are reserved a batch at a time
+        done = False
+        while not done:
+            items = [self._found.get()]
+            while items[-1] is not _DONE and len(items) < INGEST_QUEUE_SIZE:
+                try:
+                    items.append(self._found.get_nowait())
+                except queue.Empty:
+                    break
+            if items[-1] is _DONE:
+                items.pop()
+                done = True
+            if self._cancel.is_set():
+                continue
+            try:
+                self._admit(items)
+            except Exception as e:
+                self._abort(e)
+
+        with self._lock:
+            self.discovered = True
+        for q, workers in self._pools.values():
+            for _ in workers:
+                q.put(_DONE)
+        for _, workers in self._pools.values():
+            for t in workers:
+                t.join()
+        for _ in range(INGEST_METADATA_WORKERS):
+            self._copied.put(_DONE)
+
+    def _admit(self, items: List[IngestItem]):
+        admitted = []
+        duplicates = []
+        for item in items:
+            if item.path is None and item.stream is None:
+                self._fail(item, FileNotFoundError("upload no longer available; upload the file again"), retry=False)
+                continue
+            try:
+                if item.path is not None:
+                    try:
+                        st_ = item.path.stat()
+                    except FileNotFoundError:
+                        # a move renames the source away: if it got as far as the session
+                        # folder before the job stopped, the file is adopted from there
+                        if self.mode != "move" or item.stored_path is None or not item.stored_path.is_file():
+                            raise
+                        st_ = item.stored_path.stat()
+                        item.adopted = True
+                    dev, size = st_.st_dev, st_.st_size
+                else:
+                    dev, size = "upload", len(item.stream.getvalue())
+                # an adopted file's row meets the unique hash index instead
+                match = None if item.adopted else find_duplicate(self.session_id, item.source, size)
+            except OSError as e:
+                self._fail(item, e)
+                continue
+            item.size = size
+            self._tally(bytes_total=item.size)
+            if match is not None and match.session_id == self.session_id:
+                duplicates.append(("duplicate", item.item_id))
+                self._tally(duplicates=1, bytes_saved=item.size, files_done=1, bytes_done=item.size)
+                continue
+            item.match = match
+            item.ev_type = self.ev_type_choice
+            if item.ev_type == "AUTO":
+                item.ev_type = detect_type_from_name(item.name)
+            admitted.append((dev, item))
+
+        if duplicates:
+            get_writer().submit(lambda con: ImportRepo.finish_items(con, duplicates))
+        fresh = [item for _, item in admitted if item.code is None]
+        for item, code in zip(fresh, evidence_codes_for(self.session_id, [item.ev_type for item in fresh])):
+            item.code = code
+        for _, item in admitted:
+            if not item.adopted:
+                ext = "".join(Path(item.name).suffixes) or ""
+                item.stored_path = self.evidence_folder / safe_filename(f"{item.code}{ext}")
+        if admitted:
+            started = [(item.code, str(item.stored_path), item.item_id) for _, item in admitted]
+            get_writer().submit(lambda con: ImportRepo.start_items(con, started)).result()
+        for dev, item in admitted:
+            self._pool(dev).put(item)
+
+    def _pool(self, dev: Union[int, str]) -> queue.Queue:
+        if dev not in self._pools:
+            q: queue.Queue = queue.Queue(INGEST_QUEUE_SIZE)
+            workers = [
+                threading.Thread(target=self._consume, args=(q, self._copy_one),
+                                 name=f"ingest-{self.id}-copy-{dev}-{i}", daemon=True)
+                for i in range(self.workers_per_device)
+            ]
+            for t in workers:
+                t.start()
+            self._pools[dev] = (q, workers)
+        return self._pools[dev][0]
+
+    def _copy_one(self, item: IngestItem):
+        match = item.match
+        copied = 0
+
+        def progress(n: int):
+            nonlocal copied
+            copied += n
+            self._tally(bytes_done=n)
+
+        if item.adopted:
+            try:
+                method, size, sha256 = "rename", item.size, hash_file(item.stored_path)
+            except OSError as e:
+                self._fail(item, e, item.size)
+                return
+        else:
+            # a resumed item may have left its copy (or link) behind
+            item.stored_path.unlink(missing_ok=True)
+            try:
+                method, size, sha256 = store_file(item.source, item.stored_path, self.mode,
+                                                  Path(match.stored_path) if match is not None else None, progress)
+            except OSError as e:
+                self._fail(item, e, item.size - copied)
+                return
+        if match is not None:
+            sha256 = match.sha256
+        item.size, item.sha256 = size, sha256
+
+        # the same content twice within one import
+        try:
+            item.quick_hash = quick_hash(item.stored_path, size)
+            repeat = self._repeat(item)
+        except OSError:
+            repeat = False  # left to the unique index once the hash is known
+        if repeat:
+            item.stored_path.unlink(missing_ok=True)
+            get_writer().submit(lambda con: ImportRepo.finish_items(con, [("duplicate", item.item_id)]))
+            self._tally(duplicates=1, bytes_saved=size, files_done=1, bytes_done=size - copied)
+            return
+        if method != "copy":
+            self._tally(bytes_done=size - copied)
+            if match is not None:
+                self._tally(linked=1, bytes_saved=size)
+            else:
+                self._tally(zero_copy=1)
+        item.method = method
+        self._copied.put(item)
+
+    def _repeat(self, item: IngestItem) -> bool:
+        """
+        Whether this job already placed item's content. Files placed without streaming
+        have no SHA-256 yet, so only a quick-hash collision pays for full hashes; the
+        ones computed here are kept.
+        """
+        with self._seen_lock:
+            placed = self._seen.setdefault(item.quick_hash, [])
+            if placed and item.sha256 is None:
+                item.sha256 = hash_file(item.stored_path)
+            for entry in placed:
+                if not entry[1].is_file():
+                    continue  # gone since; item's copy may be the only one left
+                if entry[0] is None:
+                    entry[0] = hash_file(entry[1])
+                if entry[0] == item.sha256:
+                    return True
+            placed.append([item.sha256, item.stored_path])
+            return False
+
+    def _metadata(self):
+        def handle(item: IngestItem):
+            item.media = read_media_info(item.stored_path)
+            if item.ev_type == "AUDIO":
+                write_peaks(item.stored_path)
+            self._stored.put(item)
+
+        workers = [
+            threading.Thread(target=self._consume, args=(self._copied, handle, False),
+                             name=f"ingest-{self.id}-metadata-{i}", daemon=True)
+            for i in range(INGEST_METADATA_WORKERS)
+        ]
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        self._stored.put(_DONE)
+
+    def _write(self):
+        rows = []
+        item = None
+        try:
+            while True:
+                try:
+                    # flush a partial group whenever the pipeline goes quiet, so rows show up promptly
+                    item = self._stored.get(timeout=0.5 if rows else None)
+                except queue.Empty:
+                    self._flush(rows)
+                    rows = []
+                    continue
+                if item is _DONE:
+                    break
+                ingested_at = now_local()
+                rows.append((item.item_id, (
+                    self.session_id,
+                    fmt_ts(ingested_at),
+                    to_ms(ingested_at),
+                    item.code,
+                    item.name,
+                    item.stored_path.name,
+                    str(item.stored_path),
+                    item.ev_type,
+                    self.captured_by,
+                    *self.fields,
+                    item.size,
+                    item.sha256,
+                    item.quick_hash,
+                    item.method,
+                    str(item.path) if item.path is not None else None,
+                    *item.media.values(),
+                )))
+                if len(rows) >= self.commit_every:
+                    self._flush(rows)
+                    rows = []
+            self._flush(rows)
+        except Exception as e:
+            self._abort(e)
+            # keep draining so upstream stages can finish
+            while item is not _DONE:
+                item = self._stored.get()
+
+    def _hash_deferred(self):
+        # Files placed without streaming got no SHA-256 on the way in; hash them now that
+        # their rows are visible (including rows from a run that stopped before this).
+        # A file whose hash turns out to repeat one already in the session is a
+        # duplicate after all: its row goes, and its file too unless it restores the
+        # other row's missing one.
+        unhashed = get_repos().imports.unhashed(self.id, self.session_id)
+        with self._lock:
+            self.hashes_total = len(unhashed)
+        for item_id, code, stored_path, size in unhashed:
+            if self._cancel.is_set():
+                break
+            try:
+                sha256 = hash_file(Path(stored_path))
+            except OSError:
+                continue
+
+            def settle(con: sqlite3.Connection) -> Tuple[Optional[str], dict]:
+                if EvidenceRepo.set_sha256(con, self.session_id, code, sha256):
+                    return None, {}
+                if self._restore(con, sha256, Path(stored_path)):
+                    detail, deltas = "restored", dict(ingested=-1, zero_copy=-1, restored=1)
+                else:
+                    detail, deltas = "duplicate", dict(ingested=-1, zero_copy=-1, duplicates=1, bytes_saved=size or 0)
+                EvidenceRepo.delete(con, self.session_id, code)
+                ImportRepo.finish_items(con, [(detail, item_id)])
+                ImportRepo.save_summary(con, self.id, self._summary(**deltas))
+                return detail, deltas
+
+            detail, deltas = get_writer().submit(settle).result()
+            if detail == "duplicate":
+                Path(stored_path).unlink(missing_ok=True)
+                peaks_path(Path(stored_path)).unlink(missing_ok=True)
+            self._tally(hashes_done=1, **deltas)
+
+    def _restore(self, con: sqlite3.Connection, sha256: str, placed: Path) -> bool:
+        """
+        Runs on the writer, for a file whose content the session already holds. If that
+        row's file has gone missing, `placed` is moved to the row's path and True is
+        returned: the new copy may be the only one left (a move has removed its source),
+        so it must never be dropped as a duplicate of a row with nothing behind it.
+        """
+        held = EvidenceRepo.stored_path_for(con, self.session_id, sha256)
+        if held is None or Path(held).is_file():
+            return False
+        target = Path(held)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(placed, target)
+        if peaks_path(placed).is_file():
+            os.replace(peaks_path(placed), peaks_path(target))
+        return True
+
+    def _flush(self, rows: List[Tuple[int, Tuple]]):
+        # Rows are only written once their files are fully on disk, and their items are
+        # marked done in the same transaction, so a crash can leave a copy to redo but
+        # never a row without a file or a file recorded twice.
+        # The insert shares the writer thread with UI writes, which slot in between groups.
+        if not rows:
+            return
+
+        def commit(con: sqlite3.Connection) -> Tuple[List[Tuple], List[Tuple], dict]:
+            skipped = EvidenceRepo.insert_many(con, [row for _, row in rows])
+            restored = [row for row in skipped if self._restore(con, row[ROW_SHA256], Path(row[ROW_STORED_PATH]))]
+            details = {row[ROW_CODE]: "duplicate" for row in skipped}
+            details.update((row[ROW_CODE], "restored") for row in restored)
+            ImportRepo.finish_items(con, [(details.get(row[ROW_CODE]), item_id) for item_id, row in rows])
+            duplicates = [row for row in skipped if details[row[ROW_CODE]] == "duplicate"]
+            deltas = dict(
+                ingested=len(rows) - len(skipped),
+                duplicates=len(duplicates),
+                restored=len(restored),
+                bytes_saved=sum(row[ROW_SIZE] for row in duplicates),
+            )
+            # saved with the rows, so a job cut off after this batch still reports it
+            ImportRepo.save_summary(con, self.id, self._summary(**deltas))
+            return duplicates, restored, deltas
+
+        duplicates, restored, deltas = get_writer().submit(commit).result()
+        for row in duplicates:
+            Path(row[ROW_STORED_PATH]).unlink(missing_ok=True)
+            peaks_path(Path(row[ROW_STORED_PATH])).unlink(missing_ok=True)
+        duplicate_codes = {row[ROW_CODE] for row in duplicates}
+        skipped_codes = duplicate_codes | {row[ROW_CODE] for row in restored}
+        if self.mode == "move":
+            # only a rename took the source with it; the content is now safely recorded
+            for _, row in rows:
+                if row[ROW_METHOD] != "rename" and row[ROW_SOURCE] is not None and row[ROW_CODE] not in duplicate_codes:
+                    try:
+                        Path(row[ROW_SOURCE]).unlink(missing_ok=True)
+                    except OSError:
+                        pass
+        for _, row in rows:
+            if row[ROW_TYPE] == "PHOTO" and row[ROW_CODE] not in skipped_codes:
+                get_thumbnails().request(thumb_key(row[ROW_QUICK_HASH], row[ROW_SHA256]), Path(row[ROW_STORED_PATH]))
+        self._tally(files_done=len(rows), **deltas)
+
+
+class IngestJobs:
+    """Imports started from any browser tab; finished ones are kept for their summaries."""
+
+    def __init__(self, keep: int = 20):
+        self.keep = keep
+        self._jobs: List[IngestJob] = []
+        self._lock = threading.Lock()
+
+    def start(self, job: IngestJob) -> IngestJob:
+        with self._lock:
+            finished = [j for j in self._jobs if j.done]
+            if len(finished) >= self.keep:
+                self._jobs.remove(finished[0])
+            self._jobs.append(job)
+        return job.start()
+
+    def for_session(self, session_id: str) -> List[IngestJob]:
+        with self._lock:
+            return [j for j in self._jobs if j.session_id == session_id]
+
+    def uploading(self, session_id: str) -> set:
+        """file_ids of the uploads this session's running jobs are importing."""
+        with self._lock:
+            return {i for j in self._jobs if j.session_id == session_id and not j.done for i in j.upload_ids}
+
+    def is_running(self, job_id: int) -> bool:
+        with self._lock:
+            return any(j.id == job_id and not j.done for j in self._jobs)
+
+    def resume(self, job_id: int) -> Optional[IngestJob]:
+        """Restarts a stopped job, giving its failed files a fresh set of attempts."""
+        if self.is_running(job_id):
+            return None
+        get_writer().submit(lambda con: ImportRepo.reopen_job(con, job_id)).result()
+        return self.start(IngestJob.resume(get_repos().imports.get(job_id)))
+
+    def resume_unfinished(self):
+        # jobs still marked running were cut off by a restart
+        for record in get_repos().imports.unfinished():
+            if not self.is_running(record.id):
+                self.start(IngestJob.resume(record))
+
+
+@st.cache_resource(show_spinner=False)
+def get_ingest_jobs() -> IngestJobs:
+    jobs = IngestJobs()
+    jobs.resume_unfinished()
+    return jobs
+
+
+# =========================
+# Folder scanning
+# =========================
+class FolderScan:
+    __slots__ = ("files", "dirs", "dirs_cached", "seconds")
+
+    def __init__(self, files: List[str], dirs: int, dirs_cached: int, seconds: float):
+        self.files = files  # plain strings: building 200k Path objects costs more than the scan
+        self.dirs = dirs
+        self.dirs_cached = dirs_cached
+        self.seconds = seconds
+
+
+def scan_tree(root: Path, recursive: bool = True, ignore_ext: Optional[set] = None) -> FolderScan:
+    """
+    Lists the files under root with os.scandir, reusing the listing cached in scan_dirs
+    for every directory whose mtime hasn't changed. A directory's mtime only moves when
+    its own entries do, so subdirectories are still visited (one stat each), but the
+    files of an unchanged directory are never listed again: a repeat scan of a big,
+    mostly static archive costs a stat per directory rather than per file.
+    """
+    started = time.monotonic()
+    root_str = os.path.abspath(root)
+    ignore_ext = ignore_ext or set()
+    cache = get_repos().scan_cache.subtree(root_str, os.sep)
+    # a listing taken within the filesystem's timestamp granularity of a change could miss
+    # a second change in the same tick (FAT keeps 2 s mtimes), so recent directories aren't cached
+    settled_before = time.time_ns() - int(SCAN_RACY_SECONDS * 1e9)
+
+    files: List[str] = []
+    listings = []
+    visited = set()
+    cached = 0
+    stack = [root_str]
+    while stack:
+        directory = stack.pop()
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError:
+            continue
+        visited.add(directory)
+        entry = cache.get(directory)
+        if entry is not None and entry[0] == mtime_ns:
+            names, subdirs = entry[1], entry[2]
+            cached += 1
+        else:
+            names, subdirs = [], []
+            try:
+                with os.scandir(directory) as it:
+                    for e in it:
+                        try:
+                            if e.is_dir(follow_symlinks=False):
+                                subdirs.append(e.name)
+                            elif e.is_file():
+                                names.append(e.name)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+            if mtime_ns < settled_before:
+                listings.append((directory, mtime_ns, names, subdirs))
+        prefix = directory + os.sep
+        if ignore_ext:
+            files.extend(prefix + n for n in names if os.path.splitext(n)[1].lower() not in ignore_ext)
+        else:
+            files.extend(prefix + n for n in names)
+        if recursive:
+            stack.extend(os.path.join(directory, d) for d in subdirs)
+
+    # a non-recursive scan only speaks for the top directory
+    gone = [d for d in cache if d not in visited] if recursive else []
+    if listings or gone:
+        get_writer().submit(lambda con: ScanCacheRepo.save(con, listings, gone)).result()
+    return FolderScan(files, len(visited), cached, time.monotonic() - started)
+
+
+# =========================
+# Watch folders
+# =========================
+IN_CREATE, IN_DELETE, IN_CLOSE_WRITE = 0x100, 0x200, 0x8
+IN_MOVED_FROM, IN_MOVED_TO, IN_IGNORED = 0x40, 0x80, 0x8000
+
+class Inotify:
+    """
+    Minimal ctypes binding to Linux inotify, used only as a wake-up: an event says
+    something changed in a watched directory, the next stat snapshot says what.
+    """
+
+    MASK = IN_CREATE | IN_DELETE | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = (ctypes.c_int, ctypes.c_int)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._dirs: Dict[str, int] = {}           # directory -> watch descriptor
+        self._owners: Dict[int, set] = {}         # watch descriptor -> watch folder ids
+
+    def watch(self, directory: str, folder_id: int) -> bool:
+        wd = self._dirs.get(directory)
+        if wd is None:
+            wd = self._add_watch(self.fd, os.fsencode(directory), self.MASK)
+            if wd < 0:
+                return False  # e.g. fs.inotify.max_user_watches reached
+            self._dirs[directory] = wd
+        self._owners.setdefault(wd, set()).add(folder_id)
+        return True
+
+    def unwatch(self, folder_id: int):
+        """Drops the folder's claim on its directories, removing watches no other folder shares."""
+        for wd, owners in list(self._owners.items()):
+            owners.discard(folder_id)
+            if not owners:
+                self._rm_watch(self.fd, wd)
+                del self._owners[wd]
+                self._dirs = {d: w for d, w in self._dirs.items() if w != wd}
+
+    def read(self, timeout: float) -> set:
+        """Waits up to timeout; returns the ids of watch folders that saw events."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        changed = set()
+        offset = 0
+        while offset + 16 <= len(data):
+            wd, mask, _cookie, length = struct.unpack_from("iIII", data, offset)
+            offset += 16 + length
+            changed |= self._owners.get(wd, set())
+            if mask & IN_IGNORED:
+                # directory removed; it is watched again if it comes back
+                self._owners.pop(wd, None)
+                self._dirs = {d: w for d, w in self._dirs.items() if w != wd}
+        return changed
+
+
+def open_inotify() -> Optional[Inotify]:
+    try:
+        return Inotify()
+    except (OSError, AttributeError):
+        return None  # not Linux
+
+
+def snapshot_folder(root: Path, ignore_ext: set) -> Tuple[Dict[str, Tuple[int, int]], List[str]]:
+    """(path -> (size, mtime_ns)) for every file under root, plus every directory visited."""
+    files: Dict[str, Tuple[int, int]] = {}
+    dirs: List[str] = []
+    stack = [str(root)]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = os.scandir(directory)
+        except OSError:
+            if directory == str(root):
+                raise
+            continue
+        dirs.append(directory)
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file() and os.path.splitext(entry.name)[1].lower() not in ignore_ext:
+                        st_ = entry.stat()
+                        files[entry.path] = (st_.st_size, st_.st_mtime_ns)
+                except OSError:
+                    continue
+    return files, dirs
+
+
+class WatchService:
+    """
+    One thread per process that keeps every active watch folder importing, whether
+    or not a browser is connected. A scan diffs a stat snapshot of the folder against
+    the files already handed to ingest (watch_files, so the cursor survives restarts)
+    and starts an IngestJob for anything new or changed once it has settled (see
+    _settled); a file changed after import comes in again as its next version.
+    Where inotify works, its events trigger the scans and the periodic rescan is
+    only a safety net (WATCH_SAFETY_SECONDS); elsewhere each folder is polled
+    every poll_seconds.
+    """
+
+    def __init__(self):
+        self.inotify = open_inotify()
+        self.methods: Dict[int, str] = {}   # folder id -> "inotify" / "polling"
+        self._due: Dict[int, float] = {}    # folder id -> time.monotonic() of its next scan
+        self._pending: Dict[int, Dict[str, Tuple[Tuple[int, int], float]]] = {}  # folder id -> path -> (sig, since)
+        self._wake = threading.Event()
+        threading.Thread(target=self._run, name="basecamp-watcher", daemon=True).start()
+
+    def wake(self):
+        """Rescans every folder now; called after watch settings change."""
+        self._wake.set()
+
+    def settling(self, folder_id: int) -> int:
+        """Files seen changing in the folder that haven't been quiet long enough yet."""
+        return len(self._pending.get(folder_id, ()))
+
+    def _run(self):
+        while True:
+            try:
+                self._tick()
+            except Exception:
+                # a locked or briefly missing database must not kill the watcher
+                time.sleep(WATCH_TICK_SECONDS)
+
+    def _tick(self):
+        if self._wake.is_set():
+            self._wake.clear()
+            self._due = dict.fromkeys(self._due, 0)  # keep the keys: they're the folders being tracked
+        now = time.monotonic()
+        active = get_repos().watches.active()
+        for folder_id in self._due.keys() - {folder.id for folder in active}:
+            self._forget(folder_id)  # stopped, removed, or its session ended
+        for folder in active:
+            if self._due.get(folder.id, 0) <= now:
+                self._scan(folder)
+        if self.inotify is not None:
+            for folder_id in self.inotify.read(WATCH_TICK_SECONDS):
+                self._due[folder_id] = 0
+        else:
+            self._wake.wait(WATCH_TICK_SECONDS)
+
+    def _forget(self, folder_id: int):
+        self._due.pop(folder_id, None)
+        self._pending.pop(folder_id, None)
+        self.methods.pop(folder_id, None)
+        if self.inotify is not None:
+            self.inotify.unwatch(folder_id)
+
+    def _scan(self, folder: WatchFolderRecord):
+        options = json.loads(folder.options)
+        scanned_ms = to_ms(now_local())
+        try:
+            files, dirs = snapshot_folder(Path(folder.path), set(options.get("ignore_ext", ())))
+        except OSError as e:
+            # card pulled or share offline: try again at the polling pace
+            self._due[folder.id] = time.monotonic() + folder.poll_seconds
+            get_writer().submit(lambda con: WatchRepo.mark_scanned(con, folder.id, scanned_ms, str(e)))
+            return
+
+        known = get_repos().watches.known_files(folder.id)
+        ready = self._settled(folder, files, known)
+        if ready:
+            # the job is persisted before the cursor moves, so a crash in between re-offers the
+            # files (and dedup skips them) rather than losing them
+            get_ingest_jobs().start(IngestJob(folder.session_id, [Path(p) for p, _, _ in ready], **options))
+            get_writer().submit(lambda con: WatchRepo.record_files(con, folder.id, ready, scanned_ms)).result()
+
+        watched = self.inotify is not None and all(self.inotify.watch(d, folder.id) for d in dirs)
+        self.methods[folder.id] = "inotify" if watched else "polling"
+        next_scan = time.monotonic() + (WATCH_SAFETY_SECONDS if watched else folder.poll_seconds)
+        if self._pending.get(folder.id):
+            # nothing signals that a file has stopped changing, so look again after the quiet period
+            next_scan = min(next_scan, time.monotonic() + folder.quiet_seconds)
+        self._due[folder.id] = next_scan
+        get_writer().submit(lambda con: WatchRepo.mark_scanned(con, folder.id, scanned_ms, None))
+
+    def _settled(self, folder: WatchFolderRecord, files: Dict[str, Tuple[int, int]],
+                 known: Dict[str, Tuple[int, int]]) -> List[Tuple[str, int, int]]:
+        """
+        New or changed files whose (size, mtime) has been seen unchanged for the folder's
+        quiet period. mtime alone can't be trusted (copy tools preserve it), so a file
+        always needs two sightings; until then it waits in _pending.
+        """
+        pending = self._pending.setdefault(folder.id, {})
+        now = time.monotonic()
+        ready = []
+        for path, sig in files.items():
+            if known.get(path) == sig:
+                continue
+            seen = pending.get(path)
+            if seen is None or seen[0] != sig:
+                pending[path] = (sig, now)
+            elif now - seen[1] >= folder.quiet_seconds:
+                del pending[path]
+                ready.append((path, *sig))
+        for path in [p for p in pending if p not in files]:
+            del pending[path]  # removed before it settled
+        return ready
+
+@st.cache_resource(show_spinner=False)
+def get_watcher() -> WatchService:
+    return WatchService()
+
+
+# =========================
+# Evidence file server
+# =========================
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    First and last byte of a single-range "bytes=" header, clipped to size, or None
+    if it can't be satisfied. ValueError means the header should be ignored
+    (malformed, or several ranges) and the whole file sent.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        raise ValueError(header)
+    first, _, last = spec.strip().partition("-")
+    if not first:
+        suffix = int(last)
+        return (max(0, size - suffix), size - 1) if suffix and size else None
+    first = int(first)
+    if last and int(last) < first:
+        raise ValueError(header)
+    if first >= size:
+        return None
+    return first, min(int(last), size - 1) if last else size - 1
+
+
+class _EvidenceRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "FileServer"
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def log_message(self, format: str, *args):
+        pass
+
+    def _error(self, code: int, headers: Tuple[Tuple[str, str], ...] = ()):
+        self.send_response(code)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _serve(self, send_body: bool):
+        url = urlsplit(self.path)
+        parts = url.path.strip("/").split("/")
+        query = parse_qs(url.query)
+        if len(parts) < 2 or parts[0] != "evidence" or not parts[1].isdigit():
+            return self._error(404)
+        evidence_id = int(parts[1])
+        if not hmac.compare_digest(query.get("t", [""])[0], self.server.token(evidence_id)):
+            return self._error(404)
+        ev = get_repos().evidence.get(evidence_id)
+        try:
+            f = open(ev.stored_path, "rb") if ev is not None else None
+        except OSError:
+            f = None
+        if f is None:
+            return self._error(404)
+
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            first, last, status = 0, size - 1, 200
+            if self.headers.get("Range"):
+                try:
+                    span = parse_range(self.headers["Range"], size)
+                except ValueError:
+                    span = (first, last)
+                else:
+                    status = 206
+                if span is None:
+                    return self._error(416, (("Content-Range", f"bytes */{size}"),))
+                first, last = span
+            length = last - first + 1
+            disposition = "attachment" if "dl" in query else "inline"
+            self.send_response(status)
+            self.send_header("Content-Type", mimetypes.guess_type(ev.stored_name)[0] or "application/octet-stream")
+            self.send_header("Content-Length", str(length))
+            self.send_header("Accept-Ranges", "bytes")
+            if status == 206:
+                self.send_header("Content-Range", f"bytes {first}-{last}/{size}")
+            self.send_header("Content-Disposition", f"{disposition}; filename*=UTF-8''{quote(ev.stored_name)}")
+            self.send_header("Cache-Control", "private, max-age=3600")
+            self.end_headers()
+            if send_body and length > 0:
+                self.wfile.flush()
+                # sendfile() where the OS has it: the bytes never pass through Python
+                self.connection.sendfile(f, first, length)
+
+
+class FileServer(ThreadingHTTPServer):
+    """
+    Serves stored evidence over HTTP with Range support, so the library lists
+    plain links and a file is only read when a browser asks for it (and only the
+    part it asks for, e.g. when seeking in a video). Each link carries a token
+    derived from a per-process secret, so evidence ids can't be enumerated.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host: str = FILE_SERVER_HOST, port: int = FILE_SERVER_PORT,
+                 public_url: Optional[str] = FILE_SERVER_URL):
+        super().__init__((host, port), _EvidenceRequestHandler)
+        self._secret = os.urandom(32)
+        self.base_url = (public_url or f"http://{host}:{self.server_address[1]}").rstrip("/")
+        threading.Thread(target=self.serve_forever, name="evidence-files", daemon=True).start()
+
+    def token(self, evidence_id: int) -> str:
+        return hmac.new(self._secret, str(evidence_id).encode(), hashlib.sha256).hexdigest()[:32]
+
+    def url(self, ev: EvidenceRecord, download: bool = False) -> str:
+        link = f"{self.base_url}/evidence/{ev.id}/{quote(ev.stored_name)}?t={self.token(ev.id)}"
+        return link + "&dl=1" if download else link
+
+    def handle_error(self, request, client_address):
+        # browsers drop connections mid-file all the time (seeking, cancelled downloads)
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+@st.cache_resource(show_spinner=False)
+def get_file_server() -> Optional[FileServer]:
+    try:
+        return FileServer()
+    except OSError:
+        return None  # e.g. BASECAMP_FILE_PORT already taken; the library then shows paths only
+
+
+# =========================
+# Thumbnails
+# =========================
+def thumb_key(quick: Optional[str], sha256: Optional[str]) -> Optional[str]:
+    # the quick hash is there from the moment a row is written; a deferred sha256 comes later
+    return quick or sha256
+
+
+class ThumbnailCache:
+    """
+    Downscaled JPEG previews under THUMB_DIR, named by content hash, so a photo
+    imported twice (or into two sessions) shares one preview. Decoding happens
+    on worker threads; JPEG draft mode lets libjpeg scale by 1/2-1/8 while it
+    decodes, which is most of the speed. The cache is kept under its byte budget
+    by evicting the least recently shown previews; file mtimes are the LRU clock,
+    so the order survives a restart.
+    """
+
+    def __init__(self, root: Path = THUMB_DIR, budget: int = THUMB_CACHE_BYTES, size: int = THUMB_SIZE,
+                 workers: int = THUMB_WORKERS):
+        self.root = root
+        self.budget = budget
+        self.size = size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # key -> bytes, least recently used first
+        self._total = 0
+        self._pending = set()
+        self._failed = set()  # not decodable; not retried until restart
+        self._queue: queue.Queue = queue.Queue()
+
+        found = []
+        root.mkdir(parents=True, exist_ok=True)
+        for bucket in os.scandir(root):
+            if bucket.is_dir():
+                for entry in os.scandir(bucket.path):
+                    if entry.name.endswith(".jpg"):
+                        st_ = entry.stat()
+                        found.append((st_.st_mtime_ns, entry.name[:-4], st_.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total += size
+
+        for i in range(workers):
+            threading.Thread(target=self._work, name=f"thumbs-{i}", daemon=True).start()
+
+    def path_for(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.jpg"
+
+    def get(self, key: Optional[str]) -> Optional[Path]:
+        """The cached preview for key, marking it recently used; None if there isn't one (yet)."""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self._total -= self._entries.pop(key, 0)
+            return None
+        return path
+
+    def missing(self, key: Optional[str]) -> bool:
+        """True while a preview for key could still be made but isn't cached."""
+        with self._lock:
+            return Image is not None and key is not None and key not in self._entries and key not in self._failed
+
+    def request(self, key: Optional[str], source: Path) -> bool:
+        """Queues a preview of source; False if none is coming (no key, no Pillow, undecodable)."""
+        if key is None or Image is None:
+            return False
+        with self._lock:
+            if key in self._failed:
+                return False
+            if key in self._entries or key in self._pending:
+                return True
+            self._pending.add(key)
+        self._queue.put((key, source))
+        return True
+
+    def _work(self):
+        while True:
+            key, source = self._queue.get()
+            try:
+                size = self._render(source, self.path_for(key))
+            except Exception:
+                size = None
+            evicted = []
+            with self._lock:
+                self._pending.discard(key)
+                if size is None:
+                    self._failed.add(key)
+                    continue
+                self._entries[key] = size
+                self._total += size
+                while self._total > self.budget and len(self._entries) > 1:
+                    old, old_size = self._entries.popitem(last=False)
+                    self._total -= old_size
+                    evicted.append(old)
+            for old in evicted:
+                self.path_for(old).unlink(missing_ok=True)
+
+    def _render(self, source: Path, dst: Path) -> int:
+        dst.parent.mkdir(exist_ok=True)
+        tmp = dst.with_name(dst.name + ".part")
+        try:
+            with Image.open(source) as img:
+                img.draft("RGB", (self.size, self.size))  # JPEG only; other formats ignore it
+                img.thumbnail((self.size, self.size))
+                ImageOps.exif_transpose(img).convert("RGB").save(tmp, "JPEG", quality=80)
+            os.replace(tmp, dst)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        return dst.stat().st_size
+
+
+
+@st.cache_resource(show_spinner=False)
+def get_thumbnails() -> ThumbnailCache:
+    return ThumbnailCache()
+
+
 # =========================
 # PDF Report
 # =========================
 def generate_pdf_report(session_id: str, logo_path: Optional[Path] = None) -> Path:
-    session = fetchone("SELECT * FROM sessions WHERE session_id = ?", (session_id,))
+    repos = get_repos()
+    session = repos.sessions.get(session_id)
     if not session:
         raise ValueError("Session not found.")
 
-    logs = fetchall("SELECT * FROM logs WHERE session_id = ? ORDER BY created_at ASC", (session_id,))
-    events = fetchall("SELECT * FROM events WHERE session_id = ? ORDER BY created_at ASC", (session_id,))
-    evidence = fetchall("SELECT * FROM evidence WHERE session_id = ? ORDER BY created_at ASC", (session_id,))
-    equip = fetchall("SELECT * FROM equipment_log WHERE session_id = ? ORDER BY at ASC", (session_id,))
-    tracker = fetchall("SELECT * FROM tracker WHERE session_id = ? ORDER BY team_label ASC", (session_id,))
-
     session_folder = get_session_folder(session_id)
     report_path = session_folder / "reports" / f"Report_{session_id}.pdf"
 
@@ -283,9 +2709,9 @@ def generate_pdf_report(session_id: str, logo_path: Optional[Path] = None) -> Pa
 
     c.setFont("Helvetica", 11)
     c.drawString(x_margin, y, f"Session ID: {session_id}"); y -= 0.2 * inch
-    c.drawString(x_margin, y, f"Started: {session['started_at']}"); y -= 0.2 * inch
-    c.drawString(x_margin, y, f"Ended: {session['ended_at'] or '—'}"); y -= 0.2 * inch
-    c.drawString(x_margin, y, f"Location: {session['location'] or '—'}"); y -= 0.35 * inch
+    c.drawString(x_margin, y, f"Started: {session.started_at}"); y -= 0.2 * inch
+    c.drawString(x_margin, y, f"Ended: {session.ended_at or '—'}"); y -= 0.2 * inch
+    c.drawString(x_margin, y, f"Location: {session.location or '—'}"); y -= 0.35 * inch
 
     def section_title(title: str):
         nonlocal y
@@ -323,50 +2749,59 @@ def generate_pdf_report(session_id: str, logo_path: Optional[Path] = None) -> Pa
             y -= 0.22 * inch
 
     section_title("Timeline (Events + Notes)")
-    merged = []
-    for e in events:
-        tags = ", ".join(json.loads(e["tags"]) if e["tags"] else [])
-        extra = " — ".join([p for p in [e["room"], e["camera_label"], f"sev {e['severity']}", tags] if p])
-        merged.append((e["created_at"], "EVENT", f"{e['title']}" + (f" ({extra})" if extra else "")))
-    for l in logs:
-        tags = ", ".join(json.loads(l["tags"]) if l["tags"] else [])
-        merged.append((l["created_at"], l["mode"], f"{l['author']}: {l['text']}" + (f" [tags: {tags}]" if tags else "")))
-    merged.sort(key=lambda t: t[0])
-    for ts, kind, text in merged:
+    event_tags = repos.events.tags_for_session(session_id)
+    log_tags = repos.logs.tags_for_session(session_id)
+
+    def event_lines():
+        for e in repos.events.iter_for_session(session_id):
+            tags = ", ".join(event_tags.get(e.id, []))
+            extra = " — ".join([p for p in [e.room, e.camera_label, f"sev {e.severity}", tags] if p])
+            yield e.created_ms, e.created_at, "EVENT", f"{e.title}" + (f" ({extra})" if extra else "")
+
+    def log_lines():
+        for l in repos.logs.iter_for_session(session_id):
+            tags = ", ".join(log_tags.get(l.id, []))
+            yield l.created_ms, l.created_at, l.mode, f"{l.author}: {l.text}" + (f" [tags: {tags}]" if tags else "")
+
+    # both streams are already in time order, so merge them without materializing either
+    for _, ts, kind, text in heapq.merge(event_lines(), log_lines(), key=lambda t: t[0]):
         draw_wrapped(f"{ts} — {kind}: {text}")
 
     section_title("Evidence List")
-    if not evidence:
+    empty = True
+    for ev in repos.evidence.iter_for_session(session_id):
+        empty = False
+        draw_wrapped(f"{ev.evidence_code} — {ev.type} — {ev.stored_name} — Captured by: {ev.captured_by or '—'}")
+        meta = []
+        if ev.device: meta.append(f"Device: {ev.device}")
+        if ev.room: meta.append(f"Room: {ev.room}")
+        if ev.description: meta.append(f"Notes: {ev.description}")
+        if meta:
+            draw_wrapped(" | ".join(meta), indent=18)
+    if empty:
         draw_wrapped("No evidence logged.")
-    else:
-        for ev in evidence:
-            draw_wrapped(f"{ev['evidence_code']} — {ev['type']} — {ev['stored_name']} — Captured by: {ev['captured_by'] or '—'}")
-            meta = []
-            if ev["device"]: meta.append(f"Device: {ev['device']}")
-            if ev["room"]: meta.append(f"Room: {ev['room']}")
-            if ev["description"]: meta.append(f"Notes: {ev['description']}")
-            if meta:
-                draw_wrapped(" | ".join(meta), indent=18)
 
     section_title("Equipment Usage")
-    if not equip:
+    empty = True
+    for row in repos.equipment.iter_activity(session_id):
+        empty = False
+        draw_wrapped(
+            f"{row.at} — {row.action} — {row.gear_id} — {row.who}"
+            + (f" — battery {row.battery}%" if row.battery is not None else "")
+            + (f" — {row.condition_notes}" if row.condition_notes else "")
+        )
+    if empty:
         draw_wrapped("No equipment activity logged.")
-    else:
-        for row in equip:
-            draw_wrapped(
-                f"{row['at']} — {row['action']} — {row['gear_id']} — {row['who']}"
-                + (f" — battery {row['battery']}%" if row["battery"] is not None else "")
-                + (f" — {row['condition_notes']}" if row["condition_notes"] else "")
-            )
 
     section_title("Investigator Tracker")
-    if not tracker:
+    empty = True
+    for t in repos.tracker.for_session(session_id):
+        empty = False
+        draw_wrapped(
+            f"{t.team_label} — {t.location} — last radio: {t.last_radio_call or '—'} — needs support: {'YES' if t.needs_support else 'no'}"
+        )
+    if empty:
         draw_wrapped("No tracker entries.")
-    else:
-        for t in tracker:
-            draw_wrapped(
-                f"{t['team_label']} — {t['location']} — last radio: {t['last_radio_call'] or '—'} — needs support: {'YES' if t['needs_support'] else 'no'}"
-            )
 
     c.save()
     return report_path
@@ -408,10 +2843,8 @@ def sidebar_config():
 def require_active_session() -> Optional[str]:
     return st.session_state.get("active_session_id")
 
-def session_elapsed_str(started_at_str: str) -> str:
-    started = datetime.strptime(started_at_str, "%Y-%m-%d %H:%M:%S")
-    delta = now_local() - started
-    secs = int(delta.total_seconds())
+def session_elapsed_str(started_ms: int) -> str:
+    secs = (to_ms(now_local()) - started_ms) // 1000
     if secs < 0:
         secs = 0
     h = secs // 3600
@@ -435,6 +2868,100 @@ def maybe_autorefresh(ms: int = 1000, key: str = "refresh"):
         pass
 
 
+def ingest_jobs_panel(session_id: str):
+    """Progress bars for this session's imports; reran every second by its fragment while one is active."""
+    reported = st.session_state.setdefault("ingest_reported", set())
+    finished_now = False
+    for job in get_ingest_jobs().for_session(session_id):
+        if not job.done:
+            cols = st.columns([5, 1])
+            with cols[0]:
+                st.progress(job.fraction(), text=("Cancelling… " if job.cancelled else "Importing… ") + job.status_line())
+            with cols[1]:
+                if st.button("Cancel", key=f"ingest_cancel_{job.id}", disabled=job.cancelled):
+                    job.cancel()
+        elif job.id not in reported:
+            reported.add(job.id)
+            finished_now = True
+            msg = job.summary.describe()
+            if job.failed:
+                msg += f" {job.failed} failed."
+            if job.error is not None:
+                msg += f" Stopped: {job.error}"
+            st.toast(msg)
+    if finished_now:
+        st.rerun()
+
+def evidence_links(ev: EvidenceRecord):
+    files = get_file_server()
+    if files is not None:
+        # plain links: nothing is read until the browser follows one
+        st.markdown(f"[Open]({files.url(ev)}) • [Download]({files.url(ev, download=True)})")
+    else:
+        st.caption(f"`{ev.stored_path}`")
+
+def evidence_waveform(ev: EvidenceRecord, width: int = 600, height: int = 60):
+    # drawn from the .peaks file written at ingest; the recording itself isn't opened
+    svg = waveform_svg(Path(ev.stored_path), width, height) if ev.type == "AUDIO" else None
+    if svg:
+        st.image(svg, use_container_width=True)
+
+def evidence_list(ev_rows: List[EvidenceRecord]):
+    for ev in ev_rows:
+        version = f" — v{ev.version}" if ev.version > 1 else ""
+        st.markdown(f"**{ev.evidence_code}** — {ev.type} — `{ev.stored_name}`{version}")
+        meta = []
+        if ev.captured_by: meta.append(f"captured by: {ev.captured_by}")
+        if ev.device: meta.append(f"device: {ev.device}")
+        if ev.room: meta.append(f"room: {ev.room}")
+        if ev.linked_event_id: meta.append(f"linked event: #{ev.linked_event_id}")
+        if ev.size_bytes is not None: meta.append(fmt_bytes(ev.size_bytes))
+        if ev.ingest_method and ev.ingest_method != "copy": meta.append(f"stored by {ev.ingest_method}")
+        if ev.captured_ms is not None: meta.append(f"taken {fmt_ts(from_ms(ev.captured_ms))}")
+        if ev.duration_ms is not None: meta.append(fmt_duration(ev.duration_ms))
+        if ev.width and ev.height: meta.append(f"{ev.width}×{ev.height}")
+        if ev.sample_rate: meta.append(f"{ev.sample_rate / 1000:g} kHz")
+        if meta:
+            st.caption(" • ".join(meta))
+        if ev.description:
+            st.write(ev.description)
+        evidence_waveform(ev)
+        evidence_links(ev)
+        st.divider()
+
+def evidence_grid(ev_rows: List[EvidenceRecord], columns: int = 5):
+    """Cached previews only: originals are never opened here, just queued for a preview."""
+    thumbs = get_thumbnails()
+    waiting = False
+    for start in range(0, len(ev_rows), columns):
+        for col, ev in zip(st.columns(columns), ev_rows[start:start + columns]):
+            with col:
+                key = thumb_key(ev.quick_hash, ev.sha256)
+                path = thumbs.get(key) if ev.type == "PHOTO" else None
+                svg = waveform_svg(Path(ev.stored_path), 160, 60) if ev.type == "AUDIO" else None
+                if path is not None:
+                    st.image(str(path), use_container_width=True)
+                elif ev.type == "PHOTO" and thumbs.request(key, Path(ev.stored_path)):
+                    waiting = True
+                    st.caption("preview coming…")
+                elif svg:
+                    st.image(svg, use_container_width=True)
+                else:
+                    st.caption(ev.type)
+                st.caption(f"**{ev.evidence_code}**")
+                evidence_links(ev)
+    if not waiting and st.session_state.pop("evidence_grid_waiting", False):
+        st.rerun()  # everything has landed; stop the fragment's timer
+    if waiting:
+        st.session_state["evidence_grid_waiting"] = True
+
+def start_ingest(job: IngestJob):
+    # jobs finished before this tab opened aren't news
+    reported = st.session_state.setdefault("ingest_reported", set())
+    reported.update(j.id for j in get_ingest_jobs().for_session(job.session_id) if j.done)
+    get_ingest_jobs().start(job)
+
+
 def screen_startup():
     st.set_page_config(page_title=APP_TITLE, layout="wide")
     sidebar_config()
@@ -467,72 +2994,6 @@ def screen_startup():
         st.caption("Tip: Put this window on Monitor 2. Cameras (mirror/web) can live on Monitor 1.")
 
 
-def ingest_paths(
-    session_id: str,
-    file_paths: List[Path],
-    ev_type_choice: str,
-    captured_by_val: Optional[str],
-    device: Optional[str],
-    room: Optional[str],
-    desc: Optional[str],
-    linked_event_id: Optional[int],
-) -> int:
-    session_folder = get_session_folder(session_id)
-    evidence_folder = session_folder / "evidence"
-
-    ingested = 0
-    for p in file_paths:
-        if not p.exists() or not p.is_file():
-            continue
-
-        original_name = p.name
-        ext = "".join(p.suffixes) or ""
-
-        ev_type = ev_type_choice
-        if ev_type_choice == "AUTO":
-            ev_type = detect_type_from_name(original_name)
-
-        code = evidence_code_for(session_id, ev_type)
-        stored_name = safe_filename(f"{code}{ext}")
-        stored_path = evidence_folder / stored_name
-
-        # Copy file
-        try:
-            stored_path.write_bytes(p.read_bytes())
-        except Exception:
-            # If read_bytes fails for large files, stream copy
-            try:
-                import shutil
-                shutil.copy2(str(p), str(stored_path))
-            except Exception:
-                continue
-
-        execute(
-            """
-            INSERT INTO evidence(session_id, created_at, evidence_code, original_name, stored_name, stored_path, type,
-                                 captured_by, device, room, description, linked_event_id)
-            VALUES (?,?,?,?,?,?,?,?,?,?,?,?)
-            """,
-            (
-                session_id,
-                fmt_ts(now_local()),
-                code,
-                original_name,
-                stored_name,
-                str(stored_path),
-                ev_type,
-                captured_by_val,
-                (device or "").strip() or None,
-                (room or "").strip() or None,
-                (desc or "").strip() or None,
-                linked_event_id,
-            ),
-        )
-        ingested += 1
-
-    return ingested
-
-
 def screen_dashboard():
     st.set_page_config(page_title=APP_TITLE, layout="wide")
     sidebar_config()
@@ -542,7 +3003,8 @@ def screen_dashboard():
         st.session_state["screen"] = "startup"
         st.rerun()
 
-    session = fetchone("SELECT * FROM sessions WHERE session_id = ?", (session_id,))
+    repos = get_repos()
+    session = repos.sessions.get(session_id)
     if not session:
         st.session_state.pop("active_session_id", None)
         st.session_state["screen"] = "startup"
@@ -559,11 +3021,11 @@ def screen_dashboard():
             st.image(logo_bytes, use_column_width=True)
 
     with header_mid:
-        elapsed = session_elapsed_str(session["started_at"])
+        elapsed = session_elapsed_str(session.started_ms)
         st.markdown("## Session Dashboard")
         st.caption(
-            f"Session ID: {session_id} • Started: {session['started_at']} • "
-            f"Elapsed: {elapsed} • Location: {session['location'] or '—'}"
+            f"Session ID: {session_id} • Started: {session.started_at} • "
+            f"Elapsed: {elapsed} • Location: {session.location or '—'}"
         )
 
     with header_right:
@@ -578,7 +3040,7 @@ def screen_dashboard():
 
     st.divider()
 
-    tabs = st.tabs(["Logs & Events", "Evidence Intake", "Equipment", "Investigator Tracker"])
+    tabs = st.tabs(["Logs & Events", "Evidence Intake", "Equipment", "Investigator Tracker", "Search"])
 
     # -------------------------
     # Logs & Events
@@ -602,11 +3064,11 @@ def screen_dashboard():
                 if not ev_title.strip():
                     st.warning("Event title is required.")
                 else:
-                    execute(
-                        "INSERT INTO events(session_id, created_at, author, title, severity, tags, room, camera_label) VALUES (?,?,?,?,?,?,?,?)",
-                        (session_id, fmt_ts(now_local()), ev_author, ev_title.strip(), ev_sev, json.dumps(ev_tags),
-                         ev_room.strip() or None, ev_cam.strip() or None),
-                    )
+                    created = now_local()
+                    queue_write(lambda con: repos.events.insert(
+                        con, session_id, fmt_ts(created), to_ms(created), ev_author, ev_title.strip(), ev_sev, ev_tags,
+                        ev_room.strip() or None, ev_cam.strip() or None,
+                    ))
                     st.rerun()
 
             st.divider()
@@ -621,11 +3083,8 @@ def screen_dashboard():
             else:
                 note_text = st.text_area("Narrative note", height=140, placeholder="Context, observations, team decisions…")
 
-            recent_events = fetchall(
-                "SELECT id, created_at, title FROM events WHERE session_id = ? ORDER BY created_at DESC LIMIT 25",
-                (session_id,)
-            )
-            event_options = [("—", None)] + [(f"#{r['id']} • {r['created_at']} • {r['title']}", r["id"]) for r in recent_events]
+            event_options = [("—", None)] + [(f"#{r.id} • {r.created_at} • {r.title}", r.id)
+                                             for r in repos.events.recent(session_id, 25)]
             sel_label = st.selectbox("Link to an event (optional)", options=[o[0] for o in event_options])
             linked_event_id = next((eid for label, eid in event_options if label == sel_label), None)
 
@@ -633,39 +3092,51 @@ def screen_dashboard():
                 if not note_text or not note_text.strip():
                     st.warning("Note text is required.")
                 else:
-                    execute(
-                        "INSERT INTO logs(session_id, created_at, mode, author, tags, text, linked_event_id) VALUES (?,?,?,?,?,?,?)",
-                        (session_id, fmt_ts(now_local()),
-                         "QUICK" if mode == "Quick Log" else "NARRATIVE",
-                         note_author, json.dumps(note_tags), note_text.strip(), linked_event_id),
-                    )
+                    created = now_local()
+                    queue_write(lambda con: repos.logs.insert(
+                        con, session_id, fmt_ts(created), to_ms(created), "QUICK" if mode == "Quick Log" else "NARRATIVE",
+                        note_author, note_tags, note_text.strip(), linked_event_id,
+                    ))
                     st.rerun()
 
         with right:
             st.subheader("Timeline (Newest first)")
+            used_tags = repos.tags.names()
+            tag_filter = st.selectbox("Filter by tag", options=["—"] + used_tags, key="timeline_tag")
             merged = []
-            events = fetchall("SELECT * FROM events WHERE session_id = ? ORDER BY created_at DESC LIMIT 100", (session_id,))
-            logs = fetchall("SELECT * FROM logs WHERE session_id = ? ORDER BY created_at DESC LIMIT 200", (session_id,))
+            if tag_filter == "—":
+                events = repos.events.recent(session_id, 100)
+                logs = repos.logs.recent(session_id, 200)
+            else:
+                events = repos.events.with_tag(tag_filter, session_id, limit=100)
+                logs = repos.logs.with_tag(tag_filter, session_id, limit=200)
 
             for e in events:
-                merged.append(("EVENT", e["created_at"], e))
+                merged.append(("EVENT", e.created_ms, e))
             for l in logs:
-                merged.append((l["mode"], l["created_at"], l))
+                merged.append((l.mode, l.created_ms, l))
+            event_tags = repos.events.tags_for(row.id for kind, _, row in merged if kind == "EVENT")
+            event_evidence = repos.evidence.linked_to(row.id for kind, _, row in merged if kind == "EVENT")
+            log_tags = repos.logs.tags_for(row.id for kind, _, row in merged if kind != "EVENT")
 
             merged.sort(key=lambda t: t[1], reverse=True)
 
             for kind, ts, row in merged[:150]:
                 if kind == "EVENT":
-                    tag_str = ", ".join(json.loads(row["tags"]) if row["tags"] else [])
-                    meta = " • ".join([p for p in [row["room"], row["camera_label"], f"sev {row['severity']}",
+                    tag_str = ", ".join(event_tags.get(row.id, []))
+                    meta = " • ".join([p for p in [row.room, row.camera_label, f"sev {row.severity}",
                                                   (f"tags: {tag_str}" if tag_str else None)] if p])
-                    st.markdown(f"**{fmt_time(datetime.strptime(ts, '%Y-%m-%d %H:%M:%S'))} — EVENT #{row['id']}**  \n{row['title']}  \n_{meta}_")
+                    st.markdown(f"**{fmt_time(from_ms(ts))} — EVENT #{row.id}**  \n{row.title}  \n_{meta}_")
+                    for ev in event_evidence.get(row.id, []):
+                        if ev.type == "AUDIO":
+                            st.caption(f"🎙 {ev.evidence_code} — {ev.original_name}")
+                            evidence_waveform(ev, 400, 40)
                     st.divider()
                 else:
-                    tag_str = ", ".join(json.loads(row["tags"]) if row["tags"] else [])
+                    tag_str = ", ".join(log_tags.get(row.id, []))
                     mode_label = "Quick" if kind == "QUICK" else "Narrative"
                     st.markdown(
-                        f"**{fmt_time(datetime.strptime(ts, '%Y-%m-%d %H:%M:%S'))} — {mode_label}** ({row['author']})  \n{row['text']}"
+                        f"**{fmt_time(from_ms(ts))} — {mode_label}** ({row.author})  \n{row.text}"
                         + (f"  \n_tags: {tag_str}_" if tag_str else "")
                     )
                     st.divider()
@@ -691,128 +3162,199 @@ def screen_dashboard():
 
         desc = st.text_area("Description / what was happening (optional)", height=90)
 
-        recent_events = fetchall(
-            "SELECT id, created_at, title FROM events WHERE session_id = ? ORDER BY created_at DESC LIMIT 50",
-            (session_id,)
-        )
-        event_options = [("—", None)] + [(f"#{r['id']} • {r['created_at']} • {r['title']}", r["id"]) for r in recent_events]
+        event_options = [("—", None)] + [(f"#{r.id} • {r.created_at} • {r.title}", r.id)
+                                         for r in repos.events.recent(session_id, 50)]
         sel_label = st.selectbox("Link to an event marker (optional)", options=[o[0] for o in event_options], key="evidence_link_event")
         linked_event_id = next((eid for label, eid in event_options if label == sel_label), None)
 
+        fields = (ev_type_choice, captured_by_val, device, room, desc, linked_event_id)
+        active = any(not j.done for j in get_ingest_jobs().for_session(session_id))
+        st.fragment(ingest_jobs_panel, run_every=1.0 if active else None)(session_id)
+
         st.markdown("### A) Quick Upload (manual)")
         uploads = st.file_uploader("Evidence files", accept_multiple_files=True)
-        if uploads and st.button("Ingest Uploaded Files", type="primary"):
-            # write uploads to temp then ingest paths
-            tmp_dir = DATA_DIR / "_tmp_uploads"
-            tmp_dir.mkdir(parents=True, exist_ok=True)
-            paths = []
-            for up in uploads:
-                p = tmp_dir / safe_filename(up.name)
-                p.write_bytes(up.getbuffer())
-                paths.append(p)
-            ing = ingest_paths(session_id, paths, ev_type_choice, captured_by_val, device, room, desc, linked_event_id)
-            st.success(f"Ingested {ing} file(s).")
-            # cleanup
-            try:
-                for p in paths:
-                    p.unlink(missing_ok=True)
-            except Exception:
-                pass
+        # the uploader keeps its files after the rerun; don't import them twice at once
+        busy = bool(uploads) and bool(get_ingest_jobs().uploading(session_id) & {up.file_id for up in uploads})
+        if busy:
+            st.caption("These files are being imported.")
+        if uploads and st.button("Ingest Uploaded Files", type="primary", disabled=busy):
+            # streamed from the uploader's in-memory buffers straight into the session folder
+            start_ingest(IngestJob(session_id, [], *fields, uploads=uploads))
             st.rerun()
 
         st.divider()
 
         st.markdown("### B) Import SD Card / Folder (recommended)")
-        folder_cols = st.columns([2, 1, 1])
+        folder_cols = st.columns([2, 1, 1, 1, 1])
         with folder_cols[0]:
             folder_path = st.text_input("Folder path", placeholder=r"E:\DCIM  or  C:\Users\Admin\Desktop\CaseFiles\SDCardDump")
         with folder_cols[1]:
             recursive = st.checkbox("Include subfolders", value=True)
         with folder_cols[2]:
             ignore_ext = st.text_input("Ignore extensions (comma)", value=".db,.ini,.tmp")
+        with folder_cols[3]:
+            workers = st.number_input("Parallel copies per drive", min_value=1, max_value=16,
+                                      value=INGEST_WORKERS_PER_DEVICE,
+                                      help="SD cards usually do best with 1–2, SSDs with more")
+        with folder_cols[4]:
+            import_mode = st.selectbox(
+                "Same-drive files", ["copy", "link", "move"],
+                format_func={"copy": "Copy", "link": "Hard-link", "move": "Move"}.get,
+                help="Files on the same drive as the evidence store can be cloned (reflink), "
+                     "hard-linked or moved instead of copied. Copy still clones where the "
+                     "filesystem supports it; other drives are always copied.",
+            )
 
         ignore_set = {e.strip().lower() for e in ignore_ext.split(",") if e.strip()}
 
-        def scan_folder(path_str: str) -> List[Path]:
-            p = Path(path_str)
-            if not p.exists() or not p.is_dir():
-                return []
-            if recursive:
-                all_files = [x for x in p.rglob("*") if x.is_file()]
-            else:
-                all_files = [x for x in p.glob("*") if x.is_file()]
-            if ignore_set:
-                all_files = [x for x in all_files if x.suffix.lower() not in ignore_set]
-            return all_files
-
         if st.button("Scan Folder"):
-            files = scan_folder(folder_path)
-            st.session_state["import_scan"] = [str(x) for x in files]
-            st.success(f"Found {len(files)} file(s).")
+            if Path(folder_path).is_dir():
+                scan = scan_tree(Path(folder_path), recursive, ignore_set)
+                st.session_state["import_scan"] = scan.files
+                st.success(f"Found {len(scan.files)} file(s) in {scan.dirs} folder(s) "
+                           f"({scan.dirs_cached} unchanged since the last scan) in {scan.seconds:.2f}s.")
+            else:
+                st.session_state["import_scan"] = []
+                st.success("Found 0 file(s).")
 
-        files_scanned = [Path(x) for x in st.session_state.get("import_scan", [])]
+        files_scanned = st.session_state.get("import_scan", [])  # strings; Paths only once imported
         if files_scanned:
             st.caption(f"Ready to import: {len(files_scanned)} file(s).")
             if st.button("Import Scanned Files", type="primary"):
-                ing = ingest_paths(session_id, files_scanned, ev_type_choice, captured_by_val, device, room, desc, linked_event_id)
-                st.success(f"Ingested {ing} file(s).")
+                start_ingest(IngestJob(session_id, [Path(x) for x in files_scanned], *fields, mode=import_mode,
+                                       workers_per_device=int(workers)))
                 st.session_state["import_scan"] = []
                 st.rerun()
 
         st.divider()
         st.markdown("### C) Watch a Folder (auto-import new files)")
-        watch_cols = st.columns([2, 1, 1])
+        st.caption("Watching runs in the background and keeps importing while this page is closed, "
+                   "until it is stopped or the session ends. New files use the options above.")
+        watch_cols = st.columns([2, 1, 1, 1])
         with watch_cols[0]:
             watch_path = st.text_input("Watch path", placeholder=r"E:\  (top of SD card)  or  C:\Temp\DropZone")
         with watch_cols[1]:
-            watch_on = st.checkbox("Enable Watch", value=st.session_state.get("watch_on", False))
+            watch_every = st.selectbox("Scan every", ["2s", "5s", "10s"], index=1,
+                                       help="Polling interval where change notifications aren't available")
         with watch_cols[2]:
-            watch_every = st.selectbox("Scan every", ["2s", "5s", "10s"], index=1)
-
-        st.session_state["watch_on"] = watch_on
-
-        interval_ms = {"2s": 2000, "5s": 5000, "10s": 10000}[watch_every]
-        if watch_on:
-            maybe_autorefresh(ms=interval_ms, key="watch_refresh")
+            quiet = st.number_input("Settle time (s)", min_value=1.0, max_value=600.0, value=WATCH_QUIET_SECONDS,
+                                    help="A file is imported once its size and modified time "
+                                         "have stayed the same this long")
+        with watch_cols[3]:
+            if st.button("Start Watching", disabled=not watch_path.strip()):
+                options = dict(zip(("ev_type_choice", "captured_by_val", "device", "room", "desc", "linked_event_id"),
+                                   fields))
+                options["ignore_ext"] = sorted(ignore_set)
+                poll = {"2s": 2.0, "5s": 5.0, "10s": 10.0}[watch_every]
+                path = str(Path(watch_path.strip()).expanduser())
+                queue_write(lambda con: WatchRepo.save(con, session_id, path, options, poll, float(quiet),
+                                                       to_ms(now_local())))
+                get_watcher().wake()
+                st.rerun()
 
-            seen = set(st.session_state.get("watch_seen", []))
-            new_files = []
-            for f in scan_folder(watch_path):
-                key = str(f.resolve())
-                if key not in seen:
-                    new_files.append(f)
-                    seen.add(key)
+        watcher = get_watcher()
+        for w in repos.watches.for_session(session_id):
+            cols = st.columns([5, 1])
+            with cols[0]:
+                status = watcher.methods.get(w.id, "starting") if w.enabled else "stopped"
+                meta = [status, f"{w.files_seen} file(s) seen"]
+                settling = watcher.settling(w.id) if w.enabled else 0
+                if settling:
+                    meta.append(f"{settling} settling")
+                if w.last_scan_ms:
+                    meta.append(f"last scan {fmt_time(from_ms(w.last_scan_ms))}")
+                st.markdown(f"`{w.path}`")
+                st.caption(" • ".join(meta))
+                if w.last_error:
+                    st.caption(f"⚠ {w.last_error}")
+            with cols[1]:
+                label = "Stop" if w.enabled else "Resume"
+                if st.button(label, key=f"watch_toggle_{w.id}"):
+                    queue_write(lambda con, folder_id=w.id, on=not w.enabled: WatchRepo.set_enabled(con, folder_id, on))
+                    watcher.wake()
+                    st.rerun()
 
-            if new_files:
-                ing = ingest_paths(session_id, new_files, ev_type_choice, captured_by_val, device, room, desc, linked_event_id)
-                st.toast(f"Auto-ingested {ing} new file(s) from watch folder.")
-            st.session_state["watch_seen"] = list(seen)
+        st.divider()
+        with st.expander("Import history"):
+            history = repos.imports.history(session_id, 10)
+            if not history:
+                st.caption("No imports yet.")
+            for job in history:
+                running = get_ingest_jobs().is_running(job.id)
+                st.markdown(f"**Import #{job.id}** — {job.created_at} — {'running' if running else job.state} — "
+                            f"`{job.source_label}`")
+                # None while the job runs (or if it was cut off); its live progress shows above
+                counts = json.loads(job.item_counts) if job.item_counts else None
+                summary = json.loads(job.summary or "{}")
+                meta = [f"{n} {state}" for state, n in sorted((counts or {}).items())]
+                if summary.get("duplicates"):
+                    meta.append(f"{summary['duplicates']} duplicates")
+                if summary.get("bytes_saved"):
+                    meta.append(f"{fmt_bytes(summary['bytes_saved'])} saved")
+                if meta:
+                    st.caption(" • ".join(meta))
+                if counts and counts.get("failed"):
+                    for item in repos.imports.failures(job.id, 5):
+                        st.caption(f"✖ `{item.path}` — {item.error} (tried {item.attempts}×)")
+                unfinished = counts is None or counts.get("pending", 0) + counts.get("copying", 0) + counts.get("failed", 0)
+                if not running and unfinished and st.button("Resume", key=f"import_resume_{job.id}"):
+                    get_ingest_jobs().resume(job.id)
+                    st.rerun()
 
         st.divider()
         st.subheader("Evidence Library")
-        ev_rows = fetchall("SELECT * FROM evidence WHERE session_id = ? ORDER BY created_at DESC", (session_id,))
-        if not ev_rows:
+        stats = repos.evidence.stats(session_id)
+        if not stats:
             st.info("No evidence ingested yet.")
         else:
-            for ev in ev_rows[:200]:
-                st.markdown(f"**{ev['evidence_code']}** — {ev['type']} — `{ev['stored_name']}`")
-                meta = []
-                if ev["captured_by"]: meta.append(f"captured by: {ev['captured_by']}")
-                if ev["device"]: meta.append(f"device: {ev['device']}")
-                if ev["room"]: meta.append(f"room: {ev['room']}")
-                if ev["linked_event_id"]: meta.append(f"linked event: #{ev['linked_event_id']}")
-                if meta:
-                    st.caption(" • ".join(meta))
-                if ev["description"]:
-                    st.write(ev["description"])
-                try:
-                    p = Path(ev["stored_path"])
-                    if p.exists():
-                        st.download_button("Download", data=p.read_bytes(), file_name=p.name,
-                                           mime="application/octet-stream", key=f"dl_{ev['id']}")
-                except Exception:
-                    pass
-                st.divider()
+            page_size = 25
+            lib_cols = st.columns([1, 2, 1])
+            with lib_cols[0]:
+                lib_type = st.selectbox("Type", ["All"] + [s.type for s in stats], key="evidence_lib_type")
+            with lib_cols[1]:
+                lib_text = st.text_input("Filter by name or description", key="evidence_lib_text")
+            with lib_cols[2]:
+                view = st.radio("View", ["List", "Grid"], horizontal=True, key="evidence_lib_view")
+            lib_type = None if lib_type == "All" else lib_type
+            match = fts_query(lib_text) or None
+            if match:
+                total = repos.evidence.count_matching(session_id, lib_type, match)
+            else:
+                total = sum(s.files for s in stats if lib_type in (None, s.type))
+            # cursors[i] is the (created_ms, id) the i-th page starts after; reset when the filter changes
+            if st.session_state.get("evidence_lib_filter") != (session_id, lib_type, match):
+                st.session_state["evidence_lib_filter"] = (session_id, lib_type, match)
+                st.session_state["evidence_lib_cursors"] = [None]
+            cursors = st.session_state["evidence_lib_cursors"]
+            # one extra row says whether there is a next page
+            ev_rows = repos.evidence.page(session_id, page_size + 1, cursors[-1], lib_type, match)
+            has_next = len(ev_rows) > page_size
+            ev_rows = ev_rows[:page_size]
+            first = (len(cursors) - 1) * page_size
+            if ev_rows:
+                shown = f"Showing {first + 1}–{first + len(ev_rows)} of {total}"
+                if not match:
+                    shown += f" • {fmt_bytes(sum(s.bytes for s in stats if lib_type in (None, s.type)))}"
+                st.caption(shown)
+            else:
+                st.caption("Nothing matches.")
+            nav = st.columns([1, 1, 6])
+            with nav[0]:
+                if st.button("◀ Prev", disabled=len(cursors) == 1, key="evidence_lib_prev"):
+                    cursors.pop()
+                    st.rerun()
+            with nav[1]:
+                if st.button("Next ▶", disabled=not has_next, key="evidence_lib_next"):
+                    cursors.append((ev_rows[-1].created_ms, ev_rows[-1].id))
+                    st.rerun()
+
+            if view == "Grid":
+                pending = any(ev.type == "PHOTO" and get_thumbnails().missing(thumb_key(ev.quick_hash, ev.sha256))
+                              for ev in ev_rows)
+                # previews still being made show up as they land
+                st.fragment(evidence_grid, run_every=1.5 if pending else None)(ev_rows)
+            else:
+                evidence_list(ev_rows)
 
     # -------------------------
     # Equipment
@@ -820,9 +3362,9 @@ def screen_dashboard():
     with tabs[2]:
         st.subheader("Equipment Checkout / Return")
         authors = st.session_state.get("authors", DEFAULT_AUTHORS)
-        equipment = fetchall("SELECT * FROM equipment ORDER BY gear_id ASC")
-        gear_choices = [f"{e['gear_id']} — {e['name']}" for e in equipment]
-        gear_map = {f"{e['gear_id']} — {e['name']}": e["gear_id"] for e in equipment}
+        equipment = repos.equipment.gear()
+        gear_choices = [f"{e.gear_id} — {e.name}" for e in equipment]
+        gear_map = {f"{e.gear_id} — {e.name}": e.gear_id for e in equipment}
 
         left, right = st.columns([1, 1])
         with left:
@@ -833,10 +3375,11 @@ def screen_dashboard():
             battery_use = st.checkbox("Record battery %", value=False)
 
             if st.button("Checkout", type="primary", use_container_width=True):
-                execute(
-                    "INSERT INTO equipment_log(session_id, gear_id, action, at, who, battery, condition_notes) VALUES (?,?,?,?,?,?,?)",
-                    (session_id, gear_map[gear_label], "OUT", fmt_ts(now_local()), who, int(battery) if battery_use else None, None),
-                )
+                at = now_local()
+                queue_write(lambda con: repos.equipment.log(
+                    con, session_id, gear_map[gear_label], "OUT", fmt_ts(at), to_ms(at), who,
+                    int(battery) if battery_use else None, None,
+                ))
                 st.rerun()
 
         with right:
@@ -846,25 +3389,26 @@ def screen_dashboard():
             condition = st.text_area("Condition notes (optional)", height=80, placeholder="dead battery / weird behavior / damage…")
 
             if st.button("Return", type="primary", use_container_width=True):
-                execute(
-                    "INSERT INTO equipment_log(session_id, gear_id, action, at, who, battery, condition_notes) VALUES (?,?,?,?,?,?,?)",
-                    (session_id, gear_map[gear_label_in], "IN", fmt_ts(now_local()), who_in, None, condition.strip() or None),
-                )
+                at = now_local()
+                queue_write(lambda con: repos.equipment.log(
+                    con, session_id, gear_map[gear_label_in], "IN", fmt_ts(at), to_ms(at), who_in,
+                    None, condition.strip() or None,
+                ))
                 st.rerun()
 
         st.divider()
         st.markdown("### Equipment Activity (Newest first)")
-        eq_rows = fetchall("SELECT * FROM equipment_log WHERE session_id = ? ORDER BY at DESC LIMIT 200", (session_id,))
+        eq_rows = list(repos.equipment.recent_activity(session_id, 200))
         if not eq_rows:
             st.info("No equipment activity yet.")
         else:
             for r in eq_rows:
                 extra = []
-                if r["battery"] is not None:
-                    extra.append(f"battery {r['battery']}%")
-                if r["condition_notes"]:
-                    extra.append(r["condition_notes"])
-                st.markdown(f"**{r['at']} — {r['action']}** — {r['gear_id']} — {r['who']}" + (f"  \n_{' • '.join(extra)}_" if extra else ""))
+                if r.battery is not None:
+                    extra.append(f"battery {r.battery}%")
+                if r.condition_notes:
+                    extra.append(r.condition_notes)
+                st.markdown(f"**{r.at} — {r.action}** — {r.gear_id} — {r.who}" + (f"  \n_{' • '.join(extra)}_" if extra else ""))
 
     # -------------------------
     # Tracker
@@ -884,36 +3428,69 @@ def screen_dashboard():
                 if not team_label.strip() or not loc.strip():
                     st.warning("Team label and location are required.")
                 else:
-                    existing = fetchone(
-                        "SELECT id FROM tracker WHERE session_id = ? AND team_label = ?",
-                        (session_id, team_label.strip()),
-                    )
-                    if existing:
-                        execute(
-                            "UPDATE tracker SET location=?, last_radio_call=?, needs_support=? WHERE id=?",
-                            (loc.strip(), last_radio.strip() or None, 1 if needs_support else 0, existing["id"]),
-                        )
-                    else:
-                        execute(
-                            "INSERT INTO tracker(session_id, team_label, location, last_radio_call, needs_support) VALUES (?,?,?,?,?)",
-                            (session_id, team_label.strip(), loc.strip(), last_radio.strip() or None, 1 if needs_support else 0),
-                        )
+                    queue_write(lambda con: repos.tracker.save(
+                        con, session_id, team_label.strip(), loc.strip(), last_radio.strip() or None, needs_support,
+                    ))
                     st.rerun()
 
         with right:
             st.markdown("### Current Teams")
-            rows = fetchall("SELECT * FROM tracker WHERE session_id = ? ORDER BY team_label ASC", (session_id,))
+            rows = list(repos.tracker.for_session(session_id))
             if not rows:
                 st.info("No teams yet.")
             else:
                 for r in rows:
-                    flag = "🟥 NEEDS SUPPORT" if r["needs_support"] else "🟩 OK"
-                    st.markdown(f"**{r['team_label']}** — {r['location']}  \n{flag}  \n_last radio: {r['last_radio_call'] or '—'}_")
-                    if st.button(f"Remove {r['team_label']}", key=f"rm_team_{r['id']}"):
-                        execute("DELETE FROM tracker WHERE id = ?", (r["id"],))
+                    flag = "🟥 NEEDS SUPPORT" if r.needs_support else "🟩 OK"
+                    st.markdown(f"**{r.team_label}** — {r.location}  \n{flag}  \n_last radio: {r.last_radio_call or '—'}_")
+                    if st.button(f"Remove {r.team_label}", key=f"rm_team_{r.id}"):
+                        queue_write(lambda con, team_id=r.id: repos.tracker.remove(con, team_id))
                         st.rerun()
                     st.divider()
 
+    # -------------------------
+    # Search
+    # -------------------------
+    with tabs[4]:
+        st.subheader("Search Notes, Events & Evidence")
+        search_cols = st.columns([3, 1])
+        with search_cols[0]:
+            search_text = st.text_input("Search", placeholder="knock near the stairs", key="search_text")
+        with search_cols[1]:
+            scope = st.radio("Scope", ["This session", "All sessions"], horizontal=True, key="search_scope")
+
+        page_size = 20
+        search_key = (search_text, scope)
+        if st.session_state.get("search_key") != search_key:
+            st.session_state["search_key"] = search_key
+            st.session_state["search_page"] = 0
+        page = st.session_state.get("search_page", 0)
+
+        if search_text.strip():
+            total, results = search_all(
+                search_text,
+                session_id=session_id if scope == "This session" else None,
+                limit=page_size,
+                offset=page * page_size,
+            )
+            if not total:
+                st.info("No matches.")
+            else:
+                st.caption(f"Results {page * page_size + 1}–{page * page_size + len(results)} of {total}")
+                for r in results:
+                    where = "" if scope == "This session" else f" • session {r.session_id}"
+                    st.markdown(f"**{r.kind} #{r.id} — {r.label}**  \n{r.snippet}  \n_{r.created_at}{where}_")
+                    st.divider()
+
+                nav = st.columns([1, 1, 4])
+                with nav[0]:
+                    if st.button("◀ Prev", disabled=page == 0, key="search_prev"):
+                        st.session_state["search_page"] = page - 1
+                        st.rerun()
+                with nav[1]:
+                    if st.button("Next ▶", disabled=(page + 1) * page_size >= total, key="search_next"):
+                        st.session_state["search_page"] = page + 1
+                        st.rerun()
+
 
 def screen_wrap():
     st.set_page_config(page_title=APP_TITLE, layout="wide")
@@ -973,7 +3550,10 @@ def screen_wrap():
 
 
 def main():
-    init_db()
+    get_db()
+    get_ingest_jobs()  # resumes imports cut off by a restart
+    get_watcher()
+    get_file_server()
 
     if "screen" not in st.session_state:
         st.session_state["screen"] = "startup"
@@ -0,0 +1,148 @@
+"""
+Throughput benchmark for the SQLite profiles in app.DB_PROFILES.
+
+    python bench_db.py [--seconds 3]
+    python bench_db.py --memory [--rows 100000]
+
+Each profile gets a fresh database (schema via app.migrate) in a temp dir next
+to this file, so the numbers reflect the disk the console actually runs on.
+--memory instead compares peak Python allocations for reading one large session
+as a sqlite3.Row list, as a list of repository records, and streamed.
+"""
+import argparse
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+import app
+from repository import LogRepo
+
+
+def bench_single_commits(db: app.Database, seconds: float) -> float:
+    con = db.connection()
+    n = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        now = app.now_local()
+        con.execute(
+            "INSERT INTO logs(session_id, created_at, created_ms, mode, author, tags, text) VALUES (?,?,?,?,?,?,?)",
+            ("bench", app.fmt_ts(now), app.to_ms(now), "QUICK", "Basecamp", "[]", f"note {n}"),
+        )
+        n += 1
+    return n / seconds
+
+
+def bench_batched_rows(db: app.Database, seconds: float, batch: int = 1000) -> float:
+    n = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        now = app.now_local()
+        ts, ms = app.fmt_ts(now), app.to_ms(now)
+        with db.transaction() as con:
+            con.executemany(
+                "INSERT INTO logs(session_id, created_at, created_ms, mode, author, tags, text) VALUES (?,?,?,?,?,?,?)",
+                [("bench", ts, ms, "QUICK", "Basecamp", "[]", f"row {n + i}") for i in range(batch)],
+            )
+        n += batch
+    return n / seconds
+
+
+def bench_reads_under_writes(db: app.Database, seconds: float) -> float:
+    stop = threading.Event()
+
+    def writer():
+        con = db.connection()
+        while not stop.is_set():
+            now = app.now_local()
+            con.execute(
+                "INSERT INTO events(session_id, created_at, created_ms, author, title) VALUES (?,?,?,?,?)",
+                ("bench", app.fmt_ts(now), app.to_ms(now), "Basecamp", "bench event"),
+            )
+
+    t = threading.Thread(target=writer, daemon=True)
+    t.start()
+    con = db.connection()
+    n = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        con.execute(
+            "SELECT * FROM logs WHERE session_id = ? ORDER BY created_ms DESC, id DESC LIMIT 200", ("bench",)
+        ).fetchall()
+        n += 1
+    stop.set()
+    t.join()
+    return n / seconds
+
+
+def peak_mib(fn) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+def bench_memory(rows: int):
+    tmp = Path(tempfile.mkdtemp(prefix="bench_db_", dir=Path(__file__).parent))
+    try:
+        db = app.Database(tmp / "bench.sqlite3")
+        app.migrate(db)
+        now = app.now_local()
+        with db.transaction() as con:
+            con.executemany(
+                "INSERT INTO logs(session_id, created_at, created_ms, mode, author, tags, text) VALUES (?,?,?,?,?,?,?)",
+                [("bench", app.fmt_ts(now), app.to_ms(now) + i, "QUICK", "Investigator A", "[]",
+                  f"hallway cam 2: shadow movement near the stairs #{i}") for i in range(rows)],
+            )
+        repo = LogRepo(db)
+        sql = "SELECT * FROM logs WHERE session_id = ? ORDER BY created_ms ASC, id ASC"
+
+        def row_list():
+            return db.connection().execute(sql, ("bench",)).fetchall()
+
+        def record_list():
+            return list(repo.iter_for_session("bench"))
+
+        def streamed():
+            for _ in repo.iter_for_session("bench"):
+                pass
+
+        print(f"{rows:,} log rows, peak traced allocations:")
+        print(f"  sqlite3.Row list   {peak_mib(row_list):8.1f} MiB")
+        print(f"  record list        {peak_mib(record_list):8.1f} MiB")
+        print(f"  streamed records   {peak_mib(streamed):8.1f} MiB")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=3.0, help="duration of each measurement")
+    parser.add_argument("--memory", action="store_true", help="run the read-path memory comparison instead")
+    parser.add_argument("--rows", type=int, default=100_000, help="session size for --memory")
+    args = parser.parse_args()
+
+    if args.memory:
+        bench_memory(args.rows)
+        return
+
+    print(f"{'profile':<12} {'commits/s':>12} {'batched rows/s':>16} {'reads/s (writer busy)':>22}")
+    for profile in app.DB_PROFILES:
+        tmp = Path(tempfile.mkdtemp(prefix="bench_db_", dir=Path(__file__).parent))
+        try:
+            db = app.Database(tmp / "bench.sqlite3", profile)
+            app.migrate(db)
+            commits = bench_single_commits(db, args.seconds)
+            batched = bench_batched_rows(db, args.seconds)
+            reads = bench_reads_under_writes(db, args.seconds)
+            print(f"{profile:<12} {commits:>12,.0f} {batched:>16,.0f} {reads:>22,.0f}")
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
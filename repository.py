@@ -0,0 +1,716 @@
+"""
+Typed data access for the Basecamp Console.
+
+Each repository owns the SQL for one table. Reads return compact __slots__
+records (attribute access, no per-row dict) and the iter_* methods stream from
+the cursor instead of building lists. Write methods take the connection they
+should run on, so they can be handed to the writer thread as-is:
+
+    queue_write(lambda con: repos.events.insert(con, ...))
+"""
+import json
+import sqlite3
+from typing import Dict, Iterable, Iterator, List, Optional, Protocol, Tuple
+
+
+class ConnectionSource(Protocol):
+    def connection(self) -> sqlite3.Connection: ...
+
+
+# =========================
+# Records
+# =========================
+class Record:
+    """Base for row records; subclasses list their columns in __slots__, in SELECT order."""
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{n}={getattr(self, n)!r}" for n in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+    @classmethod
+    def columns(cls, alias: str = "") -> str:
+        prefix = f"{alias}." if alias else ""
+        return ", ".join(prefix + n for n in cls.__slots__)
+
+    @classmethod
+    def from_row(cls, cursor: sqlite3.Cursor, row: Tuple):
+        return cls(*row)
+
+
+class SessionRecord(Record):
+    __slots__ = ("session_id", "started_at", "started_ms", "ended_at", "location", "notes")
+
+
+class LogRecord(Record):
+    __slots__ = ("id", "session_id", "created_at", "created_ms", "mode", "author", "text", "linked_event_id")
+
+
+class EventRecord(Record):
+    __slots__ = ("id", "session_id", "created_at", "created_ms", "author", "title", "severity", "room", "camera_label")
+
+
+class EvidenceRecord(Record):
+    __slots__ = (
+        "id", "session_id", "created_at", "created_ms", "evidence_code", "original_name", "stored_name",
+        "stored_path", "type", "captured_by", "device", "room", "description", "linked_event_id",
+        "size_bytes", "sha256", "quick_hash", "ingest_method", "source_path", "version",
+        "captured_ms", "duration_ms", "width", "height", "sample_rate",
+    )
+
+
+class EvidenceStatsRecord(Record):
+    __slots__ = ("type", "files", "bytes")
+
+
+class SearchHitRecord(Record):
+    """A full-text match from any searchable table; kind is NOTE, EVENT or EVIDENCE."""
+    __slots__ = ("kind", "id", "session_id", "created_at", "created_ms", "label", "snippet", "rank")
+
+
+class GearRecord(Record):
+    __slots__ = ("id", "name", "gear_id")
+
+
+class EquipmentLogRecord(Record):
+    __slots__ = ("id", "session_id", "gear_id", "action", "at", "at_ms", "who", "battery", "condition_notes")
+
+
+class TrackerRecord(Record):
+    __slots__ = ("id", "session_id", "team_label", "location", "last_radio_call", "needs_support")
+
+
+class ImportJobRecord(Record):
+    __slots__ = ("id", "session_id", "created_at", "created_ms", "sources", "options", "state", "finished_ms", "summary")
+
+
+class ImportHistoryRecord(Record):
+    """What the import history shows of a job; item_counts is JSON (state -> files), set when it stops."""
+    __slots__ = ("id", "created_at", "state", "source_label", "item_counts", "summary")
+
+
+class ImportItemRecord(Record):
+    __slots__ = ("id", "job_id", "path", "state", "attempts", "next_try_ms", "error", "evidence_code", "detail",
+                 "stored_path")
+
+
+class WatchFolderRecord(Record):
+    __slots__ = ("id", "session_id", "path", "options", "poll_seconds", "enabled", "created_ms",
+                 "last_scan_ms", "files_seen", "last_error", "quiet_seconds")
+
+
+# =========================
+# Tags
+# =========================
+# entity table -> (join table, join column)
+TAG_TABLES = {"logs": ("log_tags", "log_id"), "events": ("event_tags", "event_id")}
+
+def set_tags(con: sqlite3.Connection, entity: str, entity_id: int, names: Iterable[str]):
+    table, col = TAG_TABLES[entity]
+    names = [n for n in dict.fromkeys(names) if n]
+    con.executemany("INSERT OR IGNORE INTO tags(name) VALUES (?)", [(n,) for n in names])
+    con.execute(f"DELETE FROM {table} WHERE {col} = ?", (entity_id,))
+    con.executemany(
+        f"INSERT OR IGNORE INTO {table}({col}, tag_id) SELECT ?, id FROM tags WHERE name = ?",
+        [(entity_id, n) for n in names],
+    )
+
+
+# =========================
+# Repositories
+# =========================
+class Repo:
+    def __init__(self, db: ConnectionSource):
+        self.db = db
+
+    def _query(self, record: type, sql: str, params: Tuple = ()) -> sqlite3.Cursor:
+        cur = self.db.connection().cursor()
+        cur.row_factory = record.from_row
+        return cur.execute(sql, params)
+
+    def _one(self, record: type, sql: str, params: Tuple = ()):
+        return self._query(record, sql, params).fetchone()
+
+    def _iter(self, record: type, sql: str, params: Tuple = ()) -> Iterator:
+        yield from self._query(record, sql, params)
+
+
+class SessionRepo(Repo):
+    _GET = f"SELECT {SessionRecord.columns()} FROM sessions WHERE session_id = ?"
+
+    def get(self, session_id: str) -> Optional[SessionRecord]:
+        return self._one(SessionRecord, self._GET, (session_id,))
+
+    @staticmethod
+    def insert(con: sqlite3.Connection, session_id: str, started_at: str, started_ms: int,
+               location: Optional[str], notes: Optional[str]):
+        con.execute(
+            "INSERT INTO sessions(session_id, started_at, started_ms, location, notes) VALUES (?,?,?,?,?)",
+            (session_id, started_at, started_ms, location, notes),
+        )
+
+    @staticmethod
+    def end(con: sqlite3.Connection, session_id: str, ended_at: str):
+        con.execute("UPDATE sessions SET ended_at = ? WHERE session_id = ?", (ended_at, session_id))
+
+
+class _TaggedRepo(Repo):
+    """Shared reads for the two tagged timeline tables (logs, events)."""
+    table = ""
+    record: type = Record
+
+    def __init__(self, db: ConnectionSource):
+        super().__init__(db)
+        cols = self.record.columns("e")
+        join_table, join_col = TAG_TABLES[self.table]
+        self._recent = f"SELECT {cols} FROM {self.table} e WHERE session_id = ? ORDER BY created_ms DESC, id DESC LIMIT ?"
+        self._all = f"SELECT {cols} FROM {self.table} e WHERE session_id = ? ORDER BY created_ms ASC, id ASC"
+        # separate statements, so the session-scoped one can use the session index
+        tagged = f"SELECT {cols} FROM tags t JOIN {join_table} x ON x.tag_id = t.id JOIN {self.table} e ON e.id = x.{join_col} "
+        self._with_tag = tagged + "WHERE t.name = ? ORDER BY e.created_ms DESC, e.id DESC LIMIT ?"
+        self._with_tag_in_session = (
+            tagged + "WHERE t.name = ? AND e.session_id = ? ORDER BY e.created_ms DESC, e.id DESC LIMIT ?"
+        )
+        self._session_tags = (
+            f"SELECT x.{join_col}, t.name FROM {self.table} e JOIN {join_table} x ON x.{join_col} = e.id "
+            f"JOIN tags t ON t.id = x.tag_id WHERE e.session_id = ?"
+        )
+        self._id_tags = f"SELECT x.{join_col}, t.name FROM {join_table} x JOIN tags t ON t.id = x.tag_id WHERE x.{join_col} IN "
+
+    def recent(self, session_id: str, limit: int) -> Iterator:
+        return self._iter(self.record, self._recent, (session_id, limit))
+
+    def iter_for_session(self, session_id: str) -> Iterator:
+        """Oldest first, streamed."""
+        return self._iter(self.record, self._all, (session_id,))
+
+    def with_tag(self, tag: str, session_id: Optional[str] = None, limit: int = 200) -> Iterator:
+        """Rows carrying `tag`, newest first; session_id=None searches every session."""
+        if session_id is None:
+            return self._iter(self.record, self._with_tag, (tag, limit))
+        return self._iter(self.record, self._with_tag_in_session, (tag, session_id, limit))
+
+    def tags_for_session(self, session_id: str) -> Dict[int, List[str]]:
+        out: Dict[int, List[str]] = {}
+        for entity_id, name in self.db.connection().execute(self._session_tags, (session_id,)):
+            out.setdefault(entity_id, []).append(name)
+        return out
+
+    def tags_for(self, ids: Iterable[int]) -> Dict[int, List[str]]:
+        ids = list(ids)
+        out: Dict[int, List[str]] = {}
+        con = self.db.connection()
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            for entity_id, name in con.execute(self._id_tags + f"({','.join('?' * len(chunk))})", chunk):
+                out.setdefault(entity_id, []).append(name)
+        return out
+
+
+class TagRepo(Repo):
+    _NAMES = "SELECT name FROM tags ORDER BY name"
+
+    def names(self) -> List[str]:
+        """Every tag used so far, alphabetically."""
+        return [name for (name,) in self.db.connection().execute(self._NAMES)]
+
+
+class LogRepo(_TaggedRepo):
+    table = "logs"
+    record = LogRecord
+
+    @staticmethod
+    def insert(con: sqlite3.Connection, session_id: str, created_at: str, created_ms: int, mode: str,
+               author: str, tags: List[str], text: str, linked_event_id: Optional[int]) -> int:
+        cur = con.execute(
+            "INSERT INTO logs(session_id, created_at, created_ms, mode, author, tags, text, linked_event_id) VALUES (?,?,?,?,?,?,?,?)",
+            (session_id, created_at, created_ms, mode, author, json.dumps(tags), text, linked_event_id),
+        )
+        set_tags(con, "logs", cur.lastrowid, tags)
+        return cur.lastrowid
+
+
+class EventRepo(_TaggedRepo):
+    table = "events"
+    record = EventRecord
+
+    @staticmethod
+    def insert(con: sqlite3.Connection, session_id: str, created_at: str, created_ms: int, author: str,
+               title: str, severity: int, tags: List[str], room: Optional[str], camera_label: Optional[str]) -> int:
+        cur = con.execute(
+            "INSERT INTO events(session_id, created_at, created_ms, author, title, severity, tags, room, camera_label) VALUES (?,?,?,?,?,?,?,?,?)",
+            (session_id, created_at, created_ms, author, title, severity, json.dumps(tags), room, camera_label),
+        )
+        set_tags(con, "events", cur.lastrowid, tags)
+        return cur.lastrowid
+
+
+class EvidenceRepo(Repo):
+    INSERT_COLUMNS = (
+        "session_id", "created_at", "created_ms", "evidence_code", "original_name", "stored_name",
+        "stored_path", "type", "captured_by", "device", "room", "description", "linked_event_id",
+        "size_bytes", "sha256", "quick_hash", "ingest_method", "source_path",
+        "captured_ms", "duration_ms", "width", "height", "sample_rate",
+    )
+    # version counts earlier rows imported from the same source path in the session
+    _INSERT = (
+        f"INSERT INTO evidence({', '.join(INSERT_COLUMNS)}, version) "
+        f"VALUES ({', '.join(f'?{i}' for i in range(1, len(INSERT_COLUMNS) + 1))}, "
+        f"(SELECT COUNT(*) + 1 FROM evidence "
+        f"WHERE session_id = ?1 AND source_path = ?{INSERT_COLUMNS.index('source_path') + 1}))"
+    )
+    _INSERT_NEW = _INSERT + " ON CONFLICT(session_id, sha256) WHERE sha256 IS NOT NULL DO NOTHING"
+    _GET = f"SELECT {EvidenceRecord.columns()} FROM evidence WHERE id = ?"
+    _RECENT = f"SELECT {EvidenceRecord.columns()} FROM evidence WHERE session_id = ? ORDER BY created_ms DESC, id DESC LIMIT ?"
+    _ALL = f"SELECT {EvidenceRecord.columns()} FROM evidence WHERE session_id = ? ORDER BY created_ms ASC, id ASC"
+    # same-session matches first, so a re-import is skipped rather than linked
+    _SAME_SIZE = f"""
+        SELECT {EvidenceRecord.columns()} FROM evidence
+        WHERE size_bytes = ? AND (sha256 IS NOT NULL OR quick_hash IS NOT NULL)
+        ORDER BY session_id = ? DESC, id ASC
+    """
+
+    def get(self, evidence_id: int) -> Optional[EvidenceRecord]:
+        return self._one(EvidenceRecord, self._GET, (evidence_id,))
+
+    def recent(self, session_id: str, limit: int) -> Iterator[EvidenceRecord]:
+        return self._iter(EvidenceRecord, self._RECENT, (session_id, limit))
+
+    def iter_for_session(self, session_id: str) -> Iterator[EvidenceRecord]:
+        return self._iter(EvidenceRecord, self._ALL, (session_id,))
+
+    _STATS = "SELECT type, files, bytes FROM evidence_stats WHERE session_id = ? AND files > 0 ORDER BY type"
+
+    @staticmethod
+    def _page_filter(ev_type: Optional[str], match: Optional[str]) -> Tuple[str, Tuple]:
+        sql, params = "", ()
+        if ev_type:
+            sql += " AND type = ?"
+            params += (ev_type,)
+        if match:
+            sql += " AND id IN (SELECT rowid FROM evidence_fts WHERE evidence_fts MATCH ?)"
+            params += (match,)
+        return sql, params
+
+    def page(self, session_id: str, limit: int, before: Optional[Tuple[int, int]] = None,
+             ev_type: Optional[str] = None, match: Optional[str] = None) -> List[EvidenceRecord]:
+        """
+        Newest first, starting after the (created_ms, id) cursor `before` (the last row of
+        the previous page). Seeking on the index instead of OFFSET keeps every page as
+        cheap as the first however deep into a big session it is.
+        """
+        where, params = self._page_filter(ev_type, match)
+        if before is not None:
+            where += " AND (created_ms, id) < (?, ?)"
+            params += tuple(before)
+        sql = (f"SELECT {EvidenceRecord.columns()} FROM evidence WHERE session_id = ?{where} "
+               f"ORDER BY created_ms DESC, id DESC LIMIT ?")
+        return self._query(EvidenceRecord, sql, (session_id, *params, limit)).fetchall()
+
+    def stats(self, session_id: str) -> List[EvidenceStatsRecord]:
+        """File count and bytes per evidence type, kept up to date by triggers."""
+        return self._query(EvidenceStatsRecord, self._STATS, (session_id,)).fetchall()
+
+    def count_matching(self, session_id: str, ev_type: Optional[str], match: str) -> int:
+        # only full-text filters need counting; type totals come from stats()
+        where, params = self._page_filter(ev_type, match)
+        return self.db.connection().execute(f"SELECT COUNT(*) FROM evidence WHERE session_id = ?{where}",
+                                            (session_id, *params)).fetchone()[0]
+
+    def linked_to(self, event_ids: Iterable[int]) -> Dict[int, List[EvidenceRecord]]:
+        """Evidence linked to each of event_ids, oldest first."""
+        ids = list(event_ids)
+        out: Dict[int, List[EvidenceRecord]] = {}
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            sql = (f"SELECT {EvidenceRecord.columns()} FROM evidence "
+                   f"WHERE linked_event_id IN ({','.join('?' * len(chunk))}) ORDER BY created_ms, id")
+            for ev in self._query(EvidenceRecord, sql, tuple(chunk)):
+                out.setdefault(ev.linked_event_id, []).append(ev)
+        return out
+
+    def same_size(self, size: int, session_id: str) -> List[EvidenceRecord]:
+        """
+        Evidence of exactly `size` bytes with a hash (full, or quick while the full
+        one is deferred), this session's rows first.
+        """
+        return self._query(EvidenceRecord, self._SAME_SIZE, (size, session_id)).fetchall()
+
+    @classmethod
+    def insert_many(cls, con: sqlite3.Connection, rows: List[Tuple]) -> List[Tuple]:
+        """
+        rows are tuples in INSERT_COLUMNS order. Returns the rows that were not
+        inserted because their session already holds the same sha256 (an import
+        racing another one); everything else is written.
+        """
+        con.execute("SAVEPOINT evidence_batch")
+        try:
+            con.executemany(cls._INSERT, rows)
+            skipped = []
+        except sqlite3.IntegrityError:
+            con.execute("ROLLBACK TO evidence_batch")
+            skipped = [row for row in rows if con.execute(cls._INSERT_NEW, row).rowcount == 0]
+        con.execute("RELEASE evidence_batch")
+        return skipped
+
+    @staticmethod
+    def set_sha256(con: sqlite3.Connection, session_id: str, evidence_code: str, sha256: str) -> bool:
+        """Fills in a deferred hash; False (row unchanged) if the session already has that content."""
+        try:
+            con.execute(
+                "UPDATE evidence SET sha256 = ? WHERE session_id = ? AND evidence_code = ?",
+                (sha256, session_id, evidence_code),
+            )
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    @staticmethod
+    def stored_path_for(con: sqlite3.Connection, session_id: str, sha256: str) -> Optional[str]:
+        """Where the session's copy of this content is stored, if it has one."""
+        row = con.execute("SELECT stored_path FROM evidence WHERE session_id = ? AND sha256 = ?",
+                          (session_id, sha256)).fetchone()
+        return row[0] if row is not None else None
+
+    @staticmethod
+    def delete(con: sqlite3.Connection, session_id: str, evidence_code: str):
+        """Removes a row; its file is the caller's to remove."""
+        con.execute("DELETE FROM evidence WHERE session_id = ? AND evidence_code = ?", (session_id, evidence_code))
+
+    @staticmethod
+    def reserve_counters(con: sqlite3.Connection, session_id: str, count: int = 1) -> int:
+        """
+        Atomically reserves `count` consecutive evidence numbers and returns the first.
+        Concurrent imports each get their own block; numbers of files that then fail
+        to copy are simply skipped, never handed out twice.
+        """
+        (last_value,) = con.execute(
+            """
+            INSERT INTO evidence_counters(session_id, last_value) VALUES (?, ?)
+            ON CONFLICT(session_id) DO UPDATE SET last_value = last_value + excluded.last_value
+            RETURNING last_value
+            """,
+            (session_id, count),
+        ).fetchall()[0]
+        return last_value - count + 1
+
+
+class EquipmentRepo(Repo):
+    _GEAR = f"SELECT {GearRecord.columns()} FROM equipment ORDER BY gear_id ASC"
+    _RECENT = f"SELECT {EquipmentLogRecord.columns()} FROM equipment_log WHERE session_id = ? ORDER BY at_ms DESC, id DESC LIMIT ?"
+    _ALL = f"SELECT {EquipmentLogRecord.columns()} FROM equipment_log WHERE session_id = ? ORDER BY at_ms ASC, id ASC"
+
+    def gear(self) -> List[GearRecord]:
+        return list(self._iter(GearRecord, self._GEAR))
+
+    def recent_activity(self, session_id: str, limit: int) -> Iterator[EquipmentLogRecord]:
+        return self._iter(EquipmentLogRecord, self._RECENT, (session_id, limit))
+
+    def iter_activity(self, session_id: str) -> Iterator[EquipmentLogRecord]:
+        return self._iter(EquipmentLogRecord, self._ALL, (session_id,))
+
+    @staticmethod
+    def log(con: sqlite3.Connection, session_id: str, gear_id: str, action: str, at: str, at_ms: int,
+            who: str, battery: Optional[int], condition_notes: Optional[str]):
+        con.execute(
+            "INSERT INTO equipment_log(session_id, gear_id, action, at, at_ms, who, battery, condition_notes) VALUES (?,?,?,?,?,?,?,?)",
+            (session_id, gear_id, action, at, at_ms, who, battery, condition_notes),
+        )
+
+
+class TrackerRepo(Repo):
+    _FOR_SESSION = f"SELECT {TrackerRecord.columns()} FROM tracker WHERE session_id = ? ORDER BY team_label ASC"
+
+    def for_session(self, session_id: str) -> Iterator[TrackerRecord]:
+        return self._iter(TrackerRecord, self._FOR_SESSION, (session_id,))
+
+    @staticmethod
+    def save(con: sqlite3.Connection, session_id: str, team_label: str, location: str,
+             last_radio_call: Optional[str], needs_support: bool):
+        """Updates the team's row if it exists, otherwise creates it."""
+        existing = con.execute(
+            "SELECT id FROM tracker WHERE session_id = ? AND team_label = ?", (session_id, team_label)
+        ).fetchone()
+        if existing:
+            con.execute(
+                "UPDATE tracker SET location=?, last_radio_call=?, needs_support=? WHERE id=?",
+                (location, last_radio_call, 1 if needs_support else 0, existing[0]),
+            )
+        else:
+            con.execute(
+                "INSERT INTO tracker(session_id, team_label, location, last_radio_call, needs_support) VALUES (?,?,?,?,?)",
+                (session_id, team_label, location, last_radio_call, 1 if needs_support else 0),
+            )
+
+    @staticmethod
+    def remove(con: sqlite3.Connection, team_id: int):
+        con.execute("DELETE FROM tracker WHERE id = ?", (team_id,))
+
+
+class ImportRepo(Repo):
+    """
+    Import jobs and their per-file progress. Items move pending -> copying (evidence
+    code and target path reserved) -> done, or to failed with a retry time; a restart picks up every
+    job still marked running. A job's summary counters are saved as it goes; its
+    per-state item counts when it stops.
+    """
+    _UNFINISHED = f"SELECT {ImportJobRecord.columns()} FROM import_jobs WHERE state = 'running' ORDER BY id"
+    _GET = f"SELECT {ImportJobRecord.columns()} FROM import_jobs WHERE id = ?"
+    _HISTORY = f"SELECT {ImportHistoryRecord.columns()} FROM import_jobs WHERE session_id = ? ORDER BY id DESC LIMIT ?"
+    _COUNTS = "SELECT state, COUNT(*) FROM import_items WHERE job_id = ? GROUP BY state"
+    _UNFINISHED_ITEMS = f"""
+        SELECT {ImportItemRecord.columns()} FROM import_items
+        WHERE job_id = ? AND state IN ('pending', 'copying') ORDER BY id
+    """
+    _UNHASHED = """
+        SELECT i.id, e.evidence_code, e.stored_path, e.size_bytes FROM import_items i
+        JOIN evidence e ON e.session_id = ? AND e.evidence_code = i.evidence_code
+        WHERE i.job_id = ? AND i.state = 'done' AND e.sha256 IS NULL
+        ORDER BY i.id
+    """
+    _FAILURES = f"SELECT {ImportItemRecord.columns()} FROM import_items WHERE job_id = ? AND state = 'failed' ORDER BY id LIMIT ?"
+    _RETRYABLE = f"""
+        SELECT {ImportItemRecord.columns()} FROM import_items
+        WHERE job_id = ? AND state = 'failed' AND attempts < ? AND next_try_ms IS NOT NULL ORDER BY id
+    """
+
+    def get(self, job_id: int) -> Optional[ImportJobRecord]:
+        return self._one(ImportJobRecord, self._GET, (job_id,))
+
+    def unfinished(self) -> List[ImportJobRecord]:
+        return self._query(ImportJobRecord, self._UNFINISHED).fetchall()
+
+    def history(self, session_id: str, limit: int = 10) -> List[ImportHistoryRecord]:
+        return self._query(ImportHistoryRecord, self._HISTORY, (session_id, limit)).fetchall()
+
+    def unfinished_items(self, job_id: int) -> List[ImportItemRecord]:
+        return self._query(ImportItemRecord, self._UNFINISHED_ITEMS, (job_id,)).fetchall()
+
+    def unhashed(self, job_id: int, session_id: str) -> List[Tuple[int, str, str, int]]:
+        """(item_id, evidence_code, stored_path, size_bytes) of the job's rows still waiting for a SHA-256."""
+        return self.db.connection().execute(self._UNHASHED, (session_id, job_id)).fetchall()
+
+    def failures(self, job_id: int, limit: int) -> List[ImportItemRecord]:
+        return self._query(ImportItemRecord, self._FAILURES, (job_id, limit)).fetchall()
+
+    def retryable(self, job_id: int, max_attempts: int) -> List[ImportItemRecord]:
+        return self._query(ImportItemRecord, self._RETRYABLE, (job_id, max_attempts)).fetchall()
+
+    @classmethod
+    def count_items(cls, con: sqlite3.Connection, job_id: int) -> Dict[str, int]:
+        """Files per item state; a full pass over the job's items, so only run as a job stops."""
+        return dict(con.execute(cls._COUNTS, (job_id,)).fetchall())
+
+    @staticmethod
+    def create_job(con: sqlite3.Connection, session_id: str, created_at: str, created_ms: int,
+                   sources: List[str], source_label: str, options: Dict) -> int:
+        return con.execute(
+            "INSERT INTO import_jobs(session_id, created_at, created_ms, sources, source_label, options) "
+            "VALUES (?,?,?,?,?,?)",
+            (session_id, created_at, created_ms, json.dumps(sources), source_label, json.dumps(options)),
+        ).lastrowid
+
+    @staticmethod
+    def add_items(con: sqlite3.Connection, job_id: int, paths: List[str]) -> List[ImportItemRecord]:
+        """Records paths (once per job) and returns their items, new or from an earlier run."""
+        con.executemany("INSERT OR IGNORE INTO import_items(job_id, path) VALUES (?, ?)",
+                        [(job_id, p) for p in paths])
+        cur = con.cursor()
+        cur.row_factory = ImportItemRecord.from_row
+        marks = ",".join("?" * len(paths))
+        return cur.execute(
+            f"SELECT {ImportItemRecord.columns()} FROM import_items WHERE job_id = ? AND path IN ({marks}) ORDER BY id",
+            (job_id, *paths),
+        ).fetchall()
+
+    @staticmethod
+    def start_items(con: sqlite3.Connection, codes: List[Tuple[str, str, int]]):
+        """codes are (evidence_code, stored_path, item_id) triples."""
+        con.executemany(
+            "UPDATE import_items SET state = 'copying', evidence_code = ?, stored_path = ? WHERE id = ?", codes
+        )
+
+    @staticmethod
+    def finish_items(con: sqlite3.Connection, details: List[Tuple[Optional[str], int]]):
+        """details are (detail, item_id) pairs, detail e.g. 'duplicate' or None."""
+        con.executemany("UPDATE import_items SET state = 'done', detail = ?, error = NULL WHERE id = ?", details)
+
+    @staticmethod
+    def fail_item(con: sqlite3.Connection, item_id: int, error: str, next_try_ms: Optional[int]):
+        """next_try_ms None means the item isn't worth retrying."""
+        con.execute(
+            "UPDATE import_items SET state = 'failed', attempts = attempts + 1, error = ?, next_try_ms = ? WHERE id = ?",
+            (error, next_try_ms, item_id),
+        )
+
+    @staticmethod
+    def save_summary(con: sqlite3.Connection, job_id: int, summary: Dict):
+        con.execute("UPDATE import_jobs SET summary = ? WHERE id = ?", (json.dumps(summary), job_id))
+
+    @staticmethod
+    def finish_job(con: sqlite3.Connection, job_id: int, state: str, finished_ms: int, summary: Dict,
+                   item_counts: Dict[str, int]):
+        con.execute(
+            "UPDATE import_jobs SET state = ?, finished_ms = ?, summary = ?, item_counts = ? WHERE id = ?",
+            (state, finished_ms, json.dumps(summary), json.dumps(item_counts), job_id),
+        )
+
+    @staticmethod
+    def reopen_job(con: sqlite3.Connection, job_id: int):
+        """Marks a stopped job running again with a fresh set of attempts for its failed files."""
+        con.execute(
+            "UPDATE import_items SET state = 'pending', attempts = 0, next_try_ms = NULL WHERE job_id = ? AND state = 'failed'",
+            (job_id,),
+        )
+        con.execute("UPDATE import_jobs SET state = 'running', finished_ms = NULL, item_counts = NULL WHERE id = ?",
+                    (job_id,))
+
+
+class WatchRepo(Repo):
+    """
+    Watched folders and, per folder, the files already handed to ingest with the
+    size/mtime they had then. That file list is the watcher's cursor: whatever
+    a scan finds beyond it is new, including after a restart.
+    """
+    _FOR_SESSION = f"SELECT {WatchFolderRecord.columns()} FROM watch_folders WHERE session_id = ? ORDER BY id"
+    _ACTIVE = f"""
+        SELECT {WatchFolderRecord.columns('w')} FROM watch_folders w
+        JOIN sessions s ON s.session_id = w.session_id
+        WHERE w.enabled = 1 AND s.ended_at IS NULL
+        ORDER BY w.id
+    """
+    _KNOWN = "SELECT path, size, mtime_ns FROM watch_files WHERE folder_id = ?"
+
+    def for_session(self, session_id: str) -> List[WatchFolderRecord]:
+        return self._query(WatchFolderRecord, self._FOR_SESSION, (session_id,)).fetchall()
+
+    def active(self) -> List[WatchFolderRecord]:
+        """Enabled watches of sessions that haven't ended."""
+        return self._query(WatchFolderRecord, self._ACTIVE).fetchall()
+
+    def known_files(self, folder_id: int) -> Dict[str, Tuple[int, int]]:
+        return {path: (size, mtime_ns) for path, size, mtime_ns
+                in self.db.connection().execute(self._KNOWN, (folder_id,))}
+
+    @staticmethod
+    def save(con: sqlite3.Connection, session_id: str, path: str, options: Dict, poll_seconds: float,
+             quiet_seconds: float, created_ms: int) -> int:
+        """Creates or re-enables the session's watch on path with the given ingest options."""
+        return con.execute(
+            """
+            INSERT INTO watch_folders(session_id, path, options, poll_seconds, quiet_seconds, created_ms)
+            VALUES (?,?,?,?,?,?)
+            ON CONFLICT(session_id, path) DO UPDATE SET
+                options = excluded.options, poll_seconds = excluded.poll_seconds,
+                quiet_seconds = excluded.quiet_seconds, enabled = 1, last_error = NULL
+            RETURNING id
+            """,
+            (session_id, path, json.dumps(options), poll_seconds, quiet_seconds, created_ms),
+        ).fetchone()[0]
+
+    @staticmethod
+    def set_enabled(con: sqlite3.Connection, folder_id: int, enabled: bool):
+        con.execute("UPDATE watch_folders SET enabled = ? WHERE id = ?", (1 if enabled else 0, folder_id))
+
+    @staticmethod
+    def record_files(con: sqlite3.Connection, folder_id: int, files: List[Tuple[str, int, int]], seen_ms: int):
+        """files are (path, size, mtime_ns) now handed to ingest."""
+        con.executemany(
+            """
+            INSERT INTO watch_files(folder_id, path, size, mtime_ns, seen_ms) VALUES (?,?,?,?,?)
+            ON CONFLICT(folder_id, path) DO UPDATE SET
+                size = excluded.size, mtime_ns = excluded.mtime_ns, seen_ms = excluded.seen_ms
+            """,
+            [(folder_id, path, size, mtime_ns, seen_ms) for path, size, mtime_ns in files],
+        )
+        con.execute(
+            "UPDATE watch_folders SET files_seen = (SELECT COUNT(*) FROM watch_files WHERE folder_id = ?) WHERE id = ?",
+            (folder_id, folder_id),
+        )
+
+    @staticmethod
+    def mark_scanned(con: sqlite3.Connection, folder_id: int, scanned_ms: int, error: Optional[str]):
+        con.execute("UPDATE watch_folders SET last_scan_ms = ?, last_error = ? WHERE id = ?",
+                    (scanned_ms, error, folder_id))
+
+
+class ScanCacheRepo(Repo):
+    """
+    Per-directory listings from earlier folder scans, keyed by the directory's
+    mtime: while that is unchanged the directory's entries are too.
+    """
+    _SUBTREE = "SELECT path, mtime_ns, files, subdirs FROM scan_dirs WHERE path = ? OR (path >= ? AND path < ?)"
+
+    def subtree(self, root: str, sep: str) -> Dict[str, Tuple[int, List[str], List[str]]]:
+        """Cached listings of root and everything below it: path -> (mtime_ns, files, subdirs)."""
+        prefix = root.rstrip(sep) + sep
+        rows = self.db.connection().execute(self._SUBTREE, (root, prefix, prefix + "\U0010ffff"))
+        return {path: (mtime_ns, json.loads(files), json.loads(subdirs)) for path, mtime_ns, files, subdirs in rows}
+
+    @staticmethod
+    def save(con: sqlite3.Connection, listings: List[Tuple[str, int, List[str], List[str]]], gone: List[str]):
+        """listings are (path, mtime_ns, files, subdirs); gone are cached directories that no longer exist."""
+        con.executemany(
+            "INSERT OR REPLACE INTO scan_dirs(path, mtime_ns, files, subdirs) VALUES (?,?,?,?)",
+            [(path, mtime_ns, json.dumps(files), json.dumps(subdirs)) for path, mtime_ns, files, subdirs in listings],
+        )
+        con.executemany("DELETE FROM scan_dirs WHERE path = ?", [(path,) for path in gone])
+
+
+class SearchRepo(Repo):
+    """
+    Ranked full-text search over the FTS5 indexes of notes, events and evidence
+    (see migration 6). Queries are FTS5 MATCH expressions, built by the caller.
+    """
+    # one SELECT per searchable table, all in SearchHitRecord's column layout
+    _SELECTS = {
+        "logs": """
+            SELECT 'NOTE' AS kind, l.id, l.session_id, l.created_at, l.created_ms, l.author AS label,
+                   snippet(logs_fts, -1, '**', '**', '…', 16) AS snippet, bm25(logs_fts) AS rank
+            FROM logs_fts JOIN logs l ON l.id = logs_fts.rowid
+            WHERE logs_fts MATCH :q AND (:session_id IS NULL OR l.session_id = :session_id)
+        """,
+        "events": """
+            SELECT 'EVENT' AS kind, e.id, e.session_id, e.created_at, e.created_ms, e.title AS label,
+                   snippet(events_fts, -1, '**', '**', '…', 16) AS snippet, bm25(events_fts, 4.0, 1.0, 1.0) AS rank
+            FROM events_fts JOIN events e ON e.id = events_fts.rowid
+            WHERE events_fts MATCH :q AND (:session_id IS NULL OR e.session_id = :session_id)
+        """,
+        "evidence": """
+            SELECT 'EVIDENCE' AS kind, v.id, v.session_id, v.created_at, v.created_ms, v.evidence_code AS label,
+                   snippet(evidence_fts, -1, '**', '**', '…', 16) AS snippet, bm25(evidence_fts, 2.0, 1.0) AS rank
+            FROM evidence_fts JOIN evidence v ON v.id = evidence_fts.rowid
+            WHERE evidence_fts MATCH :q AND (:session_id IS NULL OR v.session_id = :session_id)
+        """,
+    }
+    _UNION = " UNION ALL ".join(_SELECTS.values())
+    _COUNT = f"SELECT COUNT(*) FROM ({_UNION})"
+    _PAGE = f"{_UNION} ORDER BY rank LIMIT :limit OFFSET :offset"
+
+    def search(self, q: str, session_id: Optional[str] = None, limit: int = 20,
+               offset: int = 0) -> Tuple[int, List[SearchHitRecord]]:
+        """(total matches, one page of them best first); session_id=None searches every session."""
+        params = {"q": q, "session_id": session_id, "limit": limit, "offset": offset}
+        (total,) = self.db.connection().execute(self._COUNT, params).fetchone()
+        return total, self._query(SearchHitRecord, self._PAGE, params).fetchall()
+
+
+class Repos:
+    """All repositories over one database."""
+
+    def __init__(self, db: ConnectionSource):
+        self.sessions = SessionRepo(db)
+        self.logs = LogRepo(db)
+        self.events = EventRepo(db)
+        self.evidence = EvidenceRepo(db)
+        self.tags = TagRepo(db)
+        self.search = SearchRepo(db)
+        self.equipment = EquipmentRepo(db)
+        self.tracker = TrackerRepo(db)
+        self.imports = ImportRepo(db)
+        self.watches = WatchRepo(db)
+        self.scan_cache = ScanCacheRepo(db)
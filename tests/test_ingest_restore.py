@@ -0,0 +1,54 @@
+"""
+Re-importing content whose stored file has gone missing must put the file back,
+not drop the new copy as a duplicate of a row with nothing behind it. Copy mode
+meets the conflict at insert (the hash is known), move mode at deferred hashing
+(a rename has none), so both paths are covered.
+"""
+import os
+from pathlib import Path
+
+import pytest
+
+import app
+
+
+@pytest.fixture(scope="module")
+def session_id(tmp_path_factory):
+    # the console keeps its data under ./data
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("console"))
+    try:
+        yield app.create_session()
+    finally:
+        os.chdir(cwd)
+
+
+def ingest(session_id: str, source: Path, mode: str) -> app.IngestJob:
+    job = app.IngestJob(session_id, [source], "AUTO", None, None, None, None, None, mode=mode).start()
+    assert job.wait(30)
+    assert job.error is None
+    return job
+
+
+@pytest.mark.parametrize("mode", ["copy", "move"])
+def test_reimport_restores_missing_stored_file(session_id, mode):
+    content = f"evidence imported in {mode} mode".encode()
+    source = Path(f"card-{mode}")
+    take = source / f"take-{mode}.wav"
+    source.mkdir()
+    take.write_bytes(content)
+    ingest(session_id, source, mode)
+    (stored,) = [ev for ev in app.get_repos().evidence.iter_for_session(session_id) if ev.original_name == take.name]
+    Path(stored.stored_path).unlink()
+
+    take.write_bytes(content)
+    job = ingest(session_id, source, mode)
+
+    assert job.summary.restored == 1 and job.summary.duplicates == 0
+    assert Path(stored.stored_path).read_bytes() == content
+    rows = [ev for ev in app.get_repos().evidence.iter_for_session(session_id) if ev.original_name == take.name]
+    assert [ev.id for ev in rows] == [stored.id]
+    assert take.exists() == (mode == "copy")
+    # nothing else of the re-import is left in the session folder
+    assert sorted(p.name for p in Path(stored.stored_path).parent.iterdir() if p.read_bytes() == content) \
+        == [Path(stored.stored_path).name]
@@ -0,0 +1,92 @@
+"""
+The repositories' hot reads must seek an index, not scan their table. Migrations
+drop and replace indexes (migration 5 swapped every session index for an epoch-ms
+one), so each query's plan is checked against a database built by app.migrate.
+"""
+from typing import Iterator
+
+import pytest
+
+import app
+from repository import Repos
+
+SID = "20260101_000000"
+
+
+@pytest.fixture(scope="module")
+def db(tmp_path_factory):
+    db = app.Database(tmp_path_factory.mktemp("plans") / "basecamp.sqlite3")
+    app.migrate(db)
+    return db
+
+
+def plans(db: app.Database, call):
+    """EXPLAIN QUERY PLAN details of every statement `call` runs."""
+    con = db.connection()
+    statements = []
+    con.set_trace_callback(statements.append)  # statements come with their parameters bound
+    try:
+        result = call(Repos(db))
+        if isinstance(result, Iterator):
+            list(result)
+    finally:
+        con.set_trace_callback(None)
+    # FTS5 traces its own bookkeeping on the 'main' shadow tables too
+    statements = [s for s in statements if s.lstrip().startswith("SELECT") and "'main'." not in s]
+    assert statements
+    return [[row[3] for row in con.execute(f"EXPLAIN QUERY PLAN {sql}")] for sql in statements]
+
+
+def assert_no_table_scan(plan):
+    # walking a covering index in order, or a subquery's result, is fine; reading a table itself is not
+    scans = [step for step in plan if step.startswith("SCAN") and "INDEX" not in step and "subquery" not in step]
+    assert not scans, "\n".join(plan)
+
+
+HOT_QUERIES = [
+    ("logs.recent", lambda r: r.logs.recent(SID, 200), "idx_logs_session_created_ms"),
+    ("logs.iter_for_session", lambda r: r.logs.iter_for_session(SID), "idx_logs_session_created_ms"),
+    ("logs.with_tag session", lambda r: r.logs.with_tag("voice", SID), "idx_logs_session_created_ms"),
+    ("logs.with_tag global", lambda r: r.logs.with_tag("voice"), "idx_log_tags_tag"),
+    ("logs.tags_for_session", lambda r: r.logs.tags_for_session(SID), "idx_logs_session_created_ms"),
+    ("events.recent", lambda r: r.events.recent(SID, 100), "idx_events_session_created_ms"),
+    ("events.with_tag session", lambda r: r.events.with_tag("knock", SID), "idx_events_session_created_ms"),
+    ("events.with_tag global", lambda r: r.events.with_tag("knock"), "idx_event_tags_tag"),
+    ("evidence.recent", lambda r: r.evidence.recent(SID, 20), "idx_evidence_session_created_ms"),
+    ("evidence.page", lambda r: r.evidence.page(SID, 20), "idx_evidence_session_created_ms"),
+    ("evidence.page after", lambda r: r.evidence.page(SID, 20, before=(1_700_000_000_000, 42)),
+     "idx_evidence_session_created_ms"),
+    ("evidence.page by type", lambda r: r.evidence.page(SID, 20, ev_type="PHOTO"),
+     "idx_evidence_session_type_created_ms"),
+    ("evidence.page by type after", lambda r: r.evidence.page(SID, 20, (1_700_000_000_000, 42), "AUDIO"),
+     "idx_evidence_session_type_created_ms"),
+    ("evidence.stats", lambda r: r.evidence.stats(SID), "PRIMARY KEY"),
+    ("evidence.same_size", lambda r: r.evidence.same_size(1024, SID), "idx_evidence_size_hashed"),
+    ("evidence.linked_to", lambda r: r.evidence.linked_to([1, 2, 3]), "idx_evidence_linked_event"),
+    ("equipment.recent_activity", lambda r: r.equipment.recent_activity(SID, 50),
+     "idx_equipment_log_session_at_ms"),
+    ("tracker.for_session", lambda r: r.tracker.for_session(SID), "idx_tracker_session_team"),
+    ("imports.history", lambda r: r.imports.history(SID), "idx_import_jobs_session"),
+    ("imports.unfinished", lambda r: r.imports.unfinished(), "idx_import_jobs_state"),
+    ("imports.count_items", lambda r: r.imports.count_items(r.imports.db.connection(), 1),
+     "idx_import_items_job_state"),
+    ("imports.unfinished_items", lambda r: r.imports.unfinished_items(1), "idx_import_items_job_state"),
+    ("imports.retryable", lambda r: r.imports.retryable(1, 3), "idx_import_items_job_state"),
+    ("imports.unhashed", lambda r: r.imports.unhashed(1, SID), "idx_evidence_session_code"),
+    ("tags.names", lambda r: r.tags.names(), "sqlite_autoindex_tags_1"),
+]
+
+
+@pytest.mark.parametrize("call, index", [q[1:] for q in HOT_QUERIES], ids=[q[0] for q in HOT_QUERIES])
+def test_hot_query_uses_index(db, call, index):
+    for plan in plans(db, call):
+        assert_no_table_scan(plan)
+        assert index in "\n".join(plan), "\n".join(plan)
+
+
+@pytest.mark.parametrize("session_id", [SID, None])
+def test_search_reads_fts_indexes(db, session_id):
+    for plan in plans(db, lambda r: r.search.search('"knock"*', session_id)):
+        # each MATCH is a scan of its FTS5 index; the matching rows are then fetched by rowid
+        assert_no_table_scan(plan)
+        assert "\n".join(plan).count("USING INTEGER PRIMARY KEY") == 3, "\n".join(plan)